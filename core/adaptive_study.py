@@ -0,0 +1,159 @@
+import numpy as np
+
+# Минимум повторов на конфигурацию до того, как оценивать сходимость
+MIN_REPEATS = 3
+# Потолок повторов на одну конфигурацию
+MAX_REPEATS = 20
+# Требуемая относительная полуширина 95%-доверительного интервала среднего error.
+# Для справки: при фиксированных 10 повторах в исходном исследовании медиана ~0.85
+CI_REL_TOL = 0.5
+Z_95 = 1.96
+
+
+class AdaptiveScheduler:
+    """
+    Адаптивный планировщик parameter study.
+
+    Каждая конфигурация (N_modes, N_F, N_M) сначала получает MIN_REPEATS попыток
+    (не больше MAX_REPEATS выдач, прерванные и упавшие попытки тоже считаются).
+    Дальше повторы выдаются только несошедшимся конфигурациям - тем, у которых
+    относительная полуширина доверительного интервала среднего error больше CI_REL_TOL, -
+    в порядке убывания приоритета |остаток| + неопределённость для лог-лог регрессии
+    log(mean_error) ~ log N_modes + log N_F + log N_M (та же модель, что в analythis).
+
+    Результаты могут приходить в любом порядке: record() учитывает запись,
+    task_failed() - задание, завершившееся исключением, next_task() выдаёт следующее
+    задание (N_modes, N_F, N_M, rep) или None, если сейчас выдавать нечего (все сошлись,
+    исчерпан бюджет или ждём результаты). Записи, прерванные по пределу времени
+    (timed_out) или с нечисловым error, освобождают слот задания, но в средние
+    и доверительные интервалы не входят.
+    """
+
+    def __init__(self, configs, budget=None, min_repeats=MIN_REPEATS,
+                 max_repeats=MAX_REPEATS, ci_rel_tol=CI_REL_TOL):
+        self.configs = list(configs)
+        self.budget = budget if budget is not None else len(self.configs) * max_repeats
+        self.min_repeats = min_repeats
+        self.max_repeats = max_repeats
+        self.ci_rel_tol = ci_rel_tol
+
+        self._index = {cfg: i for i, cfg in enumerate(self.configs)}
+        n = len(self.configs)
+        self._issued = np.zeros(n, dtype=int)     # выдано заданий (включая уже посчитанные)
+        self._count = np.zeros(n, dtype=int)      # получено результатов (в статистике)
+        self._attempts = np.zeros(n, dtype=int)   # завершено попыток, включая прерванные и ошибки
+        self._in_flight = np.zeros(n, dtype=int)  # выдано в этом запуске, результата ещё нет
+        self._pending = set()                     # (индекс конфигурации, rep) в работе
+        self._mean = np.zeros(n)                  # Уэлфорд: среднее error
+        self._m2 = np.zeros(n)                    # Уэлфорд: сумма квадратов отклонений
+        self._n_new = 0                           # выдано заданий в этом запуске
+        self._n_excluded = 0                      # записей, не вошедших в статистику
+
+    # ------------------------------------------------------------------ учёт
+    def record(self, rec):
+        """
+        Учесть результат (запись хранилища). Записи вне сетки конфигураций игнорируются.
+        """
+        i = self._index.get((rec['N_modes'], rec['N_F'], rec['N_M']))
+        if i is None:
+            return
+        self._release(i, rec.get('repeat', 0) - 1)
+        self._attempts[i] += 1
+        # Записи из прошлых запусков тоже занимают номера повторов
+        self._issued[i] = max(self._issued[i], rec.get('repeat', 0))
+        # error прерванного запуска - не результат сходимости: он смещал бы среднее и ДИ
+        if rec.get('timed_out') or not np.isfinite(rec['error']):
+            self._n_excluded += 1
+            return
+        self._count[i] += 1
+        delta = rec['error'] - self._mean[i]
+        self._mean[i] += delta / self._count[i]
+        self._m2[i] += delta * (rec['error'] - self._mean[i])
+
+    def task_failed(self, task):
+        """
+        Задание завершилось исключением: его слот освобождается, и конфигурация
+        снова может получить повтор (с новым номером).
+        """
+        N_modes, N_F, N_M, rep = task
+        i = self._index.get((N_modes, N_F, N_M))
+        if i is not None:
+            self._release(i, rep)
+            self._attempts[i] += 1
+
+    def _release(self, i, rep):
+        key = (i, rep)
+        if key in self._pending:
+            self._pending.discard(key)
+            self._in_flight[i] -= 1
+
+    def ci_rel_halfwidth(self):
+        """
+        Относительная полуширина 95% ДИ среднего error для каждой конфигурации
+        (inf, пока повторов меньше двух).
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(self._m2 / (self._count - 1))
+            half = Z_95 * std / np.sqrt(self._count) / np.abs(self._mean)
+        return np.where(self._count >= 2, np.nan_to_num(half, nan=np.inf), np.inf)
+
+    def converged(self):
+        return ((self._count >= self.min_repeats) & (self.ci_rel_halfwidth() <= self.ci_rel_tol)) \
+            | (self._issued >= self.max_repeats)
+
+    # ------------------------------------------------------- приоритеты
+    def _regression_priority(self):
+        """
+        |остаток| лог-лог регрессии по текущим средним плюс стандартная ошибка log(mean):
+        больше там, где модель хуже всего описывает данные или среднее ещё неточно.
+        """
+        half = self.ci_rel_halfwidth()
+        se_log = np.where(np.isfinite(half), half / Z_95, np.inf)
+        ok = (self._count >= 2) & (self._mean > 0)
+        priority = se_log.copy()
+        if ok.sum() > 4:
+            X = np.column_stack([np.ones(len(self.configs)), np.log(np.array(self.configs, dtype=float))])
+            y = np.log(np.where(ok, self._mean, 1.0))
+            coef, *_ = np.linalg.lstsq(X[ok], y[ok], rcond=None)
+            resid = np.abs(y - X @ coef)
+            priority = np.where(ok, resid + se_log, priority)
+        return priority
+
+    def next_task(self):
+        if self._n_new >= self.budget:
+            return None
+
+        # 1) Начальный план: каждой конфигурации MIN_REPEATS попыток. Считаются все
+        #    попытки, включая прерванные и упавшие: иначе конфигурация, которая всегда
+        #    падает, оставалась бы с наименьшим planned и забирала весь бюджет
+        planned = self._attempts + self._in_flight
+        need_initial = np.flatnonzero((planned < self.min_repeats) & (self._issued < self.max_repeats))
+        if len(need_initial):
+            i = need_initial[np.argmin(planned[need_initial])]
+            return self._issue(i)
+
+        # 2) Досэмплирование несошедшихся конфигураций по приоритету;
+        #    на конфигурацию одновременно не больше одного лишнего задания в работе
+        candidates = np.flatnonzero(~self.converged() & (self._in_flight == 0))
+        if not len(candidates):
+            return None
+        priority = self._regression_priority()
+        return self._issue(candidates[np.argmax(priority[candidates])])
+
+    def _issue(self, i):
+        rep = int(self._issued[i])
+        self._issued[i] += 1
+        self._in_flight[i] += 1
+        self._pending.add((i, rep))
+        self._n_new += 1
+        return (*self.configs[i], rep)
+
+    def summary(self):
+        conv = self.converged()
+        return {
+            'configs': len(self.configs),
+            'converged': int(conv.sum()),
+            'runs_total': int(self._count.sum()),
+            'runs_this_session': int(self._n_new),
+            'excluded_records': int(self._n_excluded),
+        }
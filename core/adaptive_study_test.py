@@ -0,0 +1,29 @@
+import numpy as np
+
+from core.adaptive_study import MAX_REPEATS, AdaptiveScheduler
+
+
+def _simulate(scheduler, outcome):
+    """Последовательный прогон: outcome(task) - 'ok', 'timeout' или 'error'."""
+    rng = np.random.default_rng(0)
+    issued = []
+    while (task := scheduler.next_task()) is not None:
+        issued.append(task[:3])
+        N_modes, N_F, N_M, rep = task
+        result = outcome(task)
+        if result == 'error':
+            scheduler.task_failed(task)
+            continue
+        scheduler.record({'N_modes': N_modes, 'N_F': N_F, 'N_M': N_M, 'repeat': rep + 1,
+                          'error': float(rng.lognormal(-5, 0.1)), 'timed_out': result == 'timeout'})
+    return issued
+
+
+def test_always_failing_config_does_not_starve_others():
+    configs = [(1, 1, 1), (1, 20, 20)]
+    for bad in ('timeout', 'error'):
+        scheduler = AdaptiveScheduler(configs, budget=200)
+        issued = _simulate(scheduler, lambda task: bad if task[:3] == (1, 20, 20) else 'ok')
+        assert issued.count((1, 20, 20)) <= MAX_REPEATS
+        assert issued.count((1, 1, 1)) >= scheduler.min_repeats
+        assert scheduler._issued.max() <= MAX_REPEATS
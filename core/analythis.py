@@ -1,17 +1,55 @@
 import argparse
 import os
+import sys
 import json
 import datetime
+import time
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
 
-def load_data(json_path):
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    return pd.DataFrame(data)
+# Запуск скриптом из каталога core (cd core && python analythis.py) или как
+# python core/analythis.py: в sys.path только каталог скрипта, добавляем корень проекта
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.result_store import (COLUMNAR_EXTENSIONS, load_columnar, load_dataframe, read_new_records,
+                               save_columnar)
+from core.study_aggregator import StudyAggregator
+from core.cost_model import CostModel
+
+# Колонки, которые нужны summarize_data / regression_analysis
+ANALYSIS_COLUMNS = ['N_modes', 'N_F', 'N_M', 'error', 'time_s', 'iterations', 'n_starts', 'timed_out']
+# Входные данные по умолчанию: хранилище iteration_test, а если его нет - старый JSON-массив
+DEFAULT_INPUT = os.path.join('data', 'parameter_study.jsonl')
+LEGACY_INPUT = os.path.join('data', 'parameter_study.json')
+# Бутстреп-интервалы для показателей степени регрессии
+BOOTSTRAP_SAMPLES = 2000
+BOOTSTRAP_CI = 0.95
+
+def load_data(path, columns=ANALYSIS_COLUMNS, completed_only=True):
+    # .parquet/.npz - колоночный формат (читаются только нужные колонки),
+    # .jsonl - хранилище iteration_test (построчно), иначе - старый JSON-массив.
+    # completed_only: без запусков, прерванных по пределу времени (timed_out) -
+    # их error не сошёлся, а time_s обрезан пределом, в средние и модели они не идут
+    if path.endswith(COLUMNAR_EXTENSIONS):
+        df = load_columnar(path, columns)
+    elif path.endswith('.jsonl'):
+        df = load_dataframe(path, columns)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            df = pd.DataFrame(json.load(f))
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+    if completed_only and 'timed_out' in df:
+        df = df[~df['timed_out'].isin([True, 'True', 'true'])].drop(columns='timed_out')
+    return df
+
+def convert_data(src_path, dst_path):
+    # Однократная конвертация JSON/JSONL в колоночный формат (.parquet или .npz)
+    df = load_data(src_path, columns=None, completed_only=False)
+    save_columnar(df, dst_path)
+    return len(df)
 
 def summarize_data(df, output_dir):
     os.makedirs(output_dir, exist_ok=True)
@@ -29,7 +67,37 @@ def summarize_data(df, output_dir):
     grouped.to_csv(os.path.join(output_dir,'grouped_summary.csv'), index=False)
     return grouped
 
-def regression_analysis(grouped, output_dir):
+def bootstrap_exponents(X, y, n_boot=BOOTSTRAP_SAMPLES, ci=BOOTSTRAP_CI, seed=0):
+    # Бутстреп по конфигурациям за один векторный проход: индексы выборок (B, n)
+    # превращаются в кратности строк (B, n), из них - B систем нормальных
+    # уравнений (B, p, p), которые решаются одной пачкой псевдообращений.
+    # Столбцы X, постоянные на всей выборке (например, один N_modes), не оцениваются:
+    # их показатель не определён, границы - NaN (LinearRegression даёт для них 0).
+    # pinv, как lstsq в StudyAggregator, не падает и на вырожденных повторных
+    # выборках, где постоянным оказался столбец, меняющийся на всей выборке.
+    # Возвращает (нижние, верхние) границы ci-интервала для каждого коэффициента при X.
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=float)
+    n = len(y)
+    varying = np.ptp(X, axis=0) > 0
+    A = np.column_stack([np.ones(n), X[:, varying]])
+    idx = rng.integers(0, n, size=(n_boot, n))
+    weights = np.bincount((idx + n * np.arange(n_boot)[:, None]).ravel(),
+                          minlength=n_boot * n).reshape(n_boot, n).astype(float)
+    AtA = np.einsum('bn,ni,nj->bij', weights, A, A, optimize=True)
+    Aty = np.einsum('bn,ni,n->bi', weights, A, y, optimize=True)
+    beta = np.einsum('bij,bj->bi', np.linalg.pinv(AtA, rcond=1e-10, hermitian=True), Aty)
+    alpha = (1 - ci) / 2
+    low = np.full(X.shape[1], np.nan)
+    high = np.full(X.shape[1], np.nan)
+    low[varying], high[varying] = np.quantile(beta[:, 1:], [alpha, 1 - alpha], axis=0)
+    return low, high
+
+def regression_analysis(grouped, output_dir, n_boot=BOOTSTRAP_SAMPLES):
+    # sklearn и matplotlib импортируются по месту: вместе ~2 с на запуск
+    import matplotlib.pyplot as plt
+    from sklearn.linear_model import LinearRegression
+
     os.makedirs(output_dir, exist_ok=True)
     # log transform
     X = np.log(grouped[['N_modes','N_F','N_M']].values)
@@ -43,6 +111,8 @@ def regression_analysis(grouped, output_dir):
         'parameter':['N_modes','N_F','N_M'],
         'exponent': coeffs
     })
+    if n_boot:
+        coefs_df['ci_low'], coefs_df['ci_high'] = bootstrap_exponents(X, y, n_boot)
     coefs_df.to_csv(os.path.join(output_dir,'regression_exponents.csv'), index=False)
     # formula
     formula = (f"mean_error ≈ {C:.3e} "
@@ -68,7 +138,24 @@ def regression_analysis(grouped, output_dir):
     plt.close()
     return reg, coefs_df, formula
 
+def cost_model_analysis(df, output_dir):
+    # Модель стоимости по отдельным записям (core.cost_model); её же читает планировщик
+    # исследования и окно обратной задачи
+    model = CostModel.fit(df.to_dict('records'))
+    path = os.path.join(output_dir, 'cost_model.json')
+    model.save(path)
+    lines = []
+    for target, term in model.terms.items():
+        e = term['exponents']
+        lines.append(f"{target} ≈ {np.exp(term['intercept']):.3e} "
+                     f"* N_modes^{e['N_modes']:.3f} * (1+N_F)^{e['N_F']:.3f} "
+                     f"* (1+N_M)^{e['N_M']:.3f} * n_starts^{e['n_starts']:.3f}"
+                     f"  (log-scatter {term['resid_std']:.2f})")
+    return model, path, "\n".join(lines)
+
 def plot_sensitivity(grouped, output_dir):
+    import matplotlib.pyplot as plt
+
     os.makedirs(output_dir, exist_ok=True)
     # plot error vs each parameter (averaging over others)
     for param in ['N_modes','N_F','N_M']:
@@ -85,24 +172,69 @@ def plot_sensitivity(grouped, output_dir):
         plt.savefig(os.path.join(output_dir,f'error_vs_{param}.png'))
         plt.close()
 
+def live_summary(path, output_dir, interval=10.0):
+    # Сводка по идущему исследованию: каждые interval секунд дочитываются только
+    # новые строки хранилища, агрегаты обновляются инкрементально (Ctrl+C - выход)
+    os.makedirs(output_dir, exist_ok=True)
+    aggregator = StudyAggregator()
+    offset = 0
+    try:
+        while True:
+            records, offset, restarted = read_new_records(path, offset)
+            if restarted:
+                aggregator = StudyAggregator()
+            aggregator.update(records)
+            if records or restarted:
+                grouped = aggregator.grouped()
+                grouped.to_csv(os.path.join(output_dir, 'grouped_summary.csv'), index=False)
+                print(f"[{datetime.datetime.now():%H:%M:%S}] records: {grouped['count'].sum()}, "
+                      f"configurations: {len(grouped)}; {aggregator.formula()}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    return aggregator
+
 def main():
-    parser = argparse.ArgumentParser(description="Analyze parameter_study.json")
-    parser.add_argument('--input', '-i', default='data/parameter_study.json',
-                        help='Path to parameter_study.json')
+    parser = argparse.ArgumentParser(description="Analyze parameter study results")
+    parser.add_argument('--input', '-i', default=None,
+                        help='Path to parameter_study.jsonl, .parquet, .npz or legacy parameter_study.json '
+                             f'(default: {DEFAULT_INPUT}, or {LEGACY_INPUT} if the former is missing)')
     parser.add_argument('--out', '-o', default='results',
                         help='Output directory for analysis results')
+    parser.add_argument('--convert', metavar='PATH', default=None,
+                        help='Convert --input to a columnar file (.parquet or .npz) and exit')
+    parser.add_argument('--live', metavar='SECONDS', type=float, default=None,
+                        help='Follow a running study (.jsonl) and refresh the summary every SECONDS')
+    parser.add_argument('--bootstrap', metavar='B', type=int, default=BOOTSTRAP_SAMPLES,
+                        help='Bootstrap resamples for exponent confidence intervals (0 - off)')
     args = parser.parse_args()
+    if args.input is None:
+        args.input = DEFAULT_INPUT if os.path.exists(DEFAULT_INPUT) or not os.path.exists(LEGACY_INPUT) \
+            else LEGACY_INPUT
+
+    if args.live:
+        live_summary(args.input, args.out, args.live)
+        return
+
+    if args.convert:
+        n = convert_data(args.input, args.convert)
+        print(f"Converted {n} records: {args.input} -> {args.convert}")
+        return
 
     df = load_data(args.input)
     grouped = summarize_data(df, args.out)
-    reg, coefs_df, formula = regression_analysis(grouped, args.out)
+    reg, coefs_df, formula = regression_analysis(grouped, args.out, n_boot=args.bootstrap)
     plot_sensitivity(grouped, args.out)
+    cost_model, cost_path, cost_formula = cost_model_analysis(df, args.out)
 
     # print summary to console
     print("\n=== Regression Formula ===")
     print(formula)
-    print("\n=== Regression Exponents ===")
+    print(f"\n=== Regression Exponents ({BOOTSTRAP_CI:.0%} bootstrap CI) ===" if args.bootstrap
+          else "\n=== Regression Exponents ===")
     print(coefs_df.to_string(index=False))
+    print(f"\n=== Cost Model ({cost_path}) ===")
+    print(cost_formula)
     print(f"\nAnalysis complete. Results saved in '{args.out}' directory.")
 
 if __name__ == '__main__':
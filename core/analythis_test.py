@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from core.analythis import bootstrap_exponents, load_data, regression_analysis
+
+
+def _grid(n_modes_values, n_f_values, n_m_values, seed=0):
+    # Средние ошибки по степенному закону с шумом в логарифмах
+    rng = np.random.default_rng(seed)
+    rows = [(m, f, k) for m in n_modes_values for f in n_f_values for k in n_m_values]
+    grouped = pd.DataFrame(rows, columns=['N_modes', 'N_F', 'N_M'])
+    grouped['mean_error'] = (0.03 * grouped['N_modes'] ** 1.2 * grouped['N_F'] ** -1.4
+                             * grouped['N_M'] ** 1.0 * np.exp(rng.normal(0, 0.05, len(grouped))))
+    return grouped
+
+
+def test_bootstrap_single_n_modes():
+    """Один N_modes: столбец постоянный, показатель не определён, остальные - с интервалами."""
+    grouped = _grid([3], range(1, 8), range(1, 8))
+    X = np.log(grouped[['N_modes', 'N_F', 'N_M']].values)
+    y = np.log(grouped['mean_error'].values)
+    low, high = bootstrap_exponents(X, y, n_boot=500)
+    assert np.isnan(low[0]) and np.isnan(high[0])
+    assert low[1] < -1.4 < high[1]
+    assert low[2] < 1.0 < high[2]
+
+
+def test_bootstrap_degenerate_resamples():
+    """Два значения N_F на 3 точках: часть повторных выборок вырождена, solve бы упал."""
+    grouped = _grid([1, 2, 3], [1, 2], [1])
+    X = np.log(grouped[['N_modes', 'N_F', 'N_M']].values)
+    y = np.log(grouped['mean_error'].values)
+    low, high = bootstrap_exponents(X, y, n_boot=200)
+    assert np.all(np.isfinite(low[:2])) and np.all(np.isfinite(high[:2]))
+    assert np.isnan(low[2])
+
+
+def test_regression_analysis_single_n_modes(tmp_path):
+    grouped = _grid([1], range(1, 6), range(1, 6))
+    _, coefs_df, _ = regression_analysis(grouped, str(tmp_path), n_boot=200)
+    assert coefs_df.loc[0, 'exponent'] == 0.0
+    assert np.isnan(coefs_df.loc[0, 'ci_low'])
+    assert coefs_df.loc[1, 'ci_low'] < coefs_df.loc[1, 'exponent'] < coefs_df.loc[1, 'ci_high']
+
+
+def test_load_data_drops_timed_out(tmp_path):
+    path = tmp_path / 'study.jsonl'
+    records = [dict(N_modes=1, N_F=1, N_M=1, repeat=r, error=0.01, time_s=1.0, iterations=100,
+                    timed_out=r == 2) for r in range(1, 4)]
+    path.write_text(''.join(json.dumps(rec) + '\n' for rec in records), encoding='utf-8')
+    df = load_data(str(path))
+    assert len(df) == 2 and 'timed_out' not in df
+    assert len(load_data(str(path), columns=None, completed_only=False)) == 3
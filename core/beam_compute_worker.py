@@ -0,0 +1,97 @@
+import threading
+
+from PySide6.QtCore import QThread, Signal
+
+
+def compute_beam_state(solver, critical_stress, forces, moments):
+    """
+    Все величины для отрисовки по текущим нагрузкам: эпюры, напряжения и сами нагрузки.
+    """
+    forces_dict = [{"type": "point", "value": f['value'], "position": f['position']} for f in forces]
+    moments_dict = [{"type": "moment", "value": m['value'], "position": m['position']} for m in moments]
+    loads = forces_dict + moments_dict
+
+    x_moment, moments_data = solver.calculate_moments(loads)
+    stresses = solver.calculate_stresses(moments_data)
+    x_defl, deflections = solver.calculate_deflections_test(loads)
+    x_transverse, transverse_forces = solver.calculate_transverse_forces(forces_dict)
+
+    return {
+        'moment_diagram': (x_moment, moments_data),
+        'deflections': (x_defl, deflections),
+        'stresses': (x_moment, stresses),
+        'transverse_forces': (x_transverse, transverse_forces),
+        'critical_stress': critical_stress,
+        'forces': forces_dict,
+        'applied_moments': moments_dict
+    }
+
+
+class BeamComputeWorker(QThread):
+    """
+    Расчёт балки в отдельном потоке с прореживанием кадров.
+
+    submit() (из любого потока) кладёт снимок нагрузок в слот "последний кадр":
+    если предыдущий ещё не взят в расчёт, он отбрасывается. Готовый результат
+    хранится в одном слоте; result_ready сообщает интерфейсу, что его можно
+    забрать через take_result(). Следующий кадр считается только после того,
+    как интерфейс забрал предыдущий результат: расчёт не обгоняет отрисовку,
+    не отнимает у неё GIL впустую и не копит сигналы в очереди событий.
+    """
+    result_ready = Signal()
+
+    def __init__(self, solver, critical_stress):
+        super().__init__()
+        self._cond = threading.Condition()
+        self._solver = solver
+        self._critical_stress = critical_stress
+        self._pending = None
+        self._result = None
+        self._running = True
+        self.frames_computed = 0
+        self.frames_dropped = 0
+
+    def set_solver(self, solver, critical_stress):
+        with self._cond:
+            self._solver = solver
+            self._critical_stress = critical_stress
+
+    def submit(self, forces, moments):
+        # Снимок: симулятор продолжает менять свои словари нагрузок
+        snapshot = ([dict(f) for f in forces], [dict(m) for m in moments])
+        with self._cond:
+            if self._pending is not None:
+                self.frames_dropped += 1
+            self._pending = snapshot
+            self._cond.notify()
+
+    def take_result(self):
+        with self._cond:
+            result, self._result = self._result, None
+            self._cond.notify()
+        return result
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and (self._pending is None or self._result is not None):
+                    self._cond.wait()
+                if not self._running:
+                    return
+                (forces, moments), self._pending = self._pending, None
+                solver, critical_stress = self._solver, self._critical_stress
+            try:
+                data = compute_beam_state(solver, critical_stress, forces, moments)
+            except Exception as e:
+                print(f"Ошибка расчёта балки: {e}")
+                continue
+            with self._cond:
+                self._result = data
+                self.frames_computed += 1
+            self.result_ready.emit()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
@@ -2,16 +2,20 @@ import random
 import time
 from PySide6.QtCore import QThread, Signal
 
+# Частота обновления нагрузок по умолчанию, Гц
+DEFAULT_RATE_HZ = 2.0
+
 class BeamLoadSimulator(QThread):
     update_signal = Signal(list, list)
 
-    def __init__(self, beam_length, num_forces, num_moments):
+    def __init__(self, beam_length, num_forces, num_moments, rate_hz=DEFAULT_RATE_HZ):
         super().__init__()
         self.beam_length = beam_length
         self.num_forces = num_forces
         self.num_moments = num_moments
         self.forces = self._generate_initial_loads('point', num_forces)
         self.moments = self._generate_initial_loads('moment', num_moments)
+        self.rate_hz = rate_hz
         self.is_running = True
 
     def _generate_initial_loads(self, load_type, num_loads):
@@ -22,12 +26,19 @@ class BeamLoadSimulator(QThread):
             loads.append({'type': load_type, 'value': value, 'position': position})
         return loads
 
+    def set_rate(self, rate_hz):
+        self.rate_hz = rate_hz
+
     def run(self):
+        # Шаги идут по расписанию next_tick, поэтому время на сам шаг
+        # не накапливается в отставание от заданной частоты
+        next_tick = time.perf_counter()
         while self.is_running:
             self._update_loads(self.forces)
             self._update_loads(self.moments)
             self.update_signal.emit(self.forces, self.moments)
-            time.sleep(0.5)
+            next_tick = max(next_tick + 1.0 / self.rate_hz, time.perf_counter())
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
 
     def _update_loads(self, loads):
         for load in loads:
@@ -38,4 +49,4 @@ class BeamLoadSimulator(QThread):
 
     def stop(self):
         self.is_running = False
-        self.wait()
\ No newline at end of file
+        self.wait()
@@ -91,6 +91,46 @@ class BeamSolver:
 
         return x, w_corrected
 
+    def calculate_deflections_batch(self, forces, force_positions, moments, moment_positions, num_points=1000):
+        # Пакетный аналог calculate_deflections_test: каждая строка массивов (P, N_F) / (P, N_M)
+        # задаёт отдельный набор нагрузок, результат - массив прогибов (P, num_points).
+        # Кубический интерполянт в calculate_deflections_test вычисляется в собственных узлах
+        # и совпадает с M, поэтому здесь интегрируется сама эпюра моментов.
+        forces = np.atleast_2d(np.asarray(forces, dtype=float))
+        force_positions = np.atleast_2d(np.asarray(force_positions, dtype=float))
+        moments = np.atleast_2d(np.asarray(moments, dtype=float))
+        moment_positions = np.atleast_2d(np.asarray(moment_positions, dtype=float))
+        n_batch = max(forces.shape[0], moments.shape[0])
+
+        sum_F = forces.sum(axis=1)
+        sum_M = moments.sum(axis=1)
+        sum_M_F = (forces * force_positions).sum(axis=1)
+
+        R_B = -(sum_M_F + sum_M) / self.length
+        R_A = -sum_F - R_B
+
+        x = np.linspace(0, self.length, num_points)
+        M = np.broadcast_to(R_A[:, None] * x, (n_batch, num_points)).copy()
+
+        if forces.shape[1]:
+            arm = x[None, None, :] - force_positions[:, :, None]
+            M += np.einsum('pk,pkn->pn', forces, np.where(arm > 0, arm, 0.0))
+        if moments.shape[1]:
+            applied = x[None, None, :] >= moment_positions[:, :, None]
+            M -= np.einsum('pk,pkn->pn', moments, applied.astype(float))
+
+        EI = self.E * self.I
+        f_vals = -M / EI
+
+        dx = np.diff(x)
+        dw_dx = np.zeros_like(f_vals)
+        dw_dx[:, 1:] = np.cumsum((f_vals[:, :-1] + f_vals[:, 1:]) / 2.0 * dx, axis=1)
+        w = np.zeros_like(f_vals)
+        w[:, 1:] = np.cumsum((dw_dx[:, :-1] + dw_dx[:, 1:]) / 2.0 * dx, axis=1)
+
+        w -= w[:, -1:] * np.linspace(0, 1, num_points)
+        return x, w
+
     def calculate_transverse_forces(self, forces, num_points=1000):
         sum_forces = sum(force['value'] for force in forces)
         R_A = -sum_forces / 2
@@ -1,17 +1,44 @@
+import time
+
 import numpy as np
-from scipy.optimize import minimize
+from scipy.optimize import minimize, differential_evolution, LinearConstraint
+
+from core.reverse_problem_2_test import compute_deflection_from_loads
 
 # Глобальные настройки балки
 L_GLOBAL = 10.0
 E_GLOBAL = 2e8
 I_GLOBAL = 1e-4
 
+# Прямая модель по умолчанию:
+# 'numerical' - BeamSolver.calculate_deflections_test (двойное интегрирование эпюры M);
+# 'analytic'  - замкнутые формулы из reverse_problem_2_test (точные значения в узлах x_target)
+FORWARD_BACKEND = 'numerical'
+FORWARD_BACKENDS = ('numerical', 'analytic')
+
 # Параметры для высокой точности
 GLOBAL_MAX_ITER = 2000
 GLOBAL_XTOL = 1e-12
 GLOBAL_GTOL = 1e-12
 GLOBAL_BARRIER_TOL = 1e-12
 
+# Параметры многоуровневого (coarse-to-fine) решения
+COARSE_N_POINTS = 24
+COARSE_MAX_ITER = 200
+N_REFINE = 2
+# Прямая модель грубого уровня: у численной стоимость вызова почти не зависит
+# от числа точек (накладные расходы), замкнутые формулы заметно дешевле
+COARSE_BACKEND = 'analytic'
+
+# Допуски для отсева решений, совпадающих с точностью до перестановки нагрузок
+DEDUP_POS_TOL = 1e-3
+DEDUP_VALUE_RTOL = 1e-3
+
+# Параметры глобального (популяционного) поиска
+GLOBAL_DE_POPSIZE = 15
+GLOBAL_DE_MAXITER = 300
+GLOBAL_DE_TOL = 1e-8
+
 
 def generate_random_displacements(n, L, N_modes=5, max_amplitude=1.0):
     z = np.linspace(0, L, n + 2)
@@ -22,16 +49,20 @@ def generate_random_displacements(n, L, N_modes=5, max_amplitude=1.0):
     return z, w
 
 
-def objective_function(params, solver, x_target, w_target, N_F, N_M, iter_callback=None):
+def objective_function(params, solver, x_target, w_target, N_F, N_M, iter_callback=None, backend=None):
     """
     Целевая функция. Для удобства передачи 'iter_callback' при trust-constr,
     но на самом деле callback придётся обрабатывать отдельно.
+    backend - прямая модель ('numerical' / 'analytic'), по умолчанию FORWARD_BACKEND.
     """
-    w_calc = _compute_w(params, solver, x_target, N_F, N_M)
+    w_calc = _compute_w(params, solver, x_target, N_F, N_M, backend=backend)
     return np.sum((w_calc - w_target) ** 2)
 
 
-def _compute_w(params, solver, x_target, N_F, N_M):
+def _params_to_loads(params, N_F, N_M):
+    """
+    params = [F1, a1, ..., FN_F, aN_F, M1, b1, ..., MN_M, bN_M] -> список нагрузок для BeamSolver.
+    """
     loads = []
     idx = 0
     for i in range(N_F):
@@ -44,11 +75,162 @@ def _compute_w(params, solver, x_target, N_F, N_M):
         b_i = params[idx + 1]
         loads.append({'type': 'moment', 'value': M_i, 'position': b_i})
         idx += 2
+    return loads
+
+
+def _random_init_params(N_F, N_M, canonical=False):
+    """
+    Случайное начальное приближение для одного запуска многостарта.
+    canonical=True - координаты сил и моментов упорядочены по возрастанию
+    (начальная точка сразу допустима для ограничений упорядочивания).
+    """
+    init_p = []
+    for i in range(N_F):
+        Fi = np.random.uniform(-1000, 1000)
+        ai = np.random.uniform(0, L_GLOBAL)
+        init_p.append(Fi)
+        init_p.append(ai)
+    for i in range(N_M):
+        Mi = np.random.uniform(-1000, 1000)
+        bi = np.random.uniform(0, L_GLOBAL)
+        init_p.append(Mi)
+        init_p.append(bi)
+    init_p = np.array(init_p, dtype=float)
+    if canonical:
+        init_p = canonicalize_params(init_p, N_F, N_M)
+    return init_p
+
+
+###############################################################################
+# Симметрия перестановок нагрузок
+###############################################################################
+def canonicalize_params(params, N_F, N_M):
+    """
+    Приводит вектор параметров к каноническому виду: пары (F_i, a_i)
+    сортируются по a_i, пары (M_j, b_j) - по b_j. Перестановка одинаковых
+    по типу нагрузок не меняет прогиб, поэтому канонический вид однозначно
+    задаёт решение.
+    """
+    params = np.asarray(params, dtype=float)
+    forces = params[:2 * N_F].reshape(N_F, 2)
+    moments = params[2 * N_F:2 * (N_F + N_M)].reshape(N_M, 2)
+    forces = forces[np.argsort(forces[:, 1], kind='stable')]
+    moments = moments[np.argsort(moments[:, 1], kind='stable')]
+    return np.concatenate((forces.ravel(), moments.ravel()))
+
+
+def _ordering_constraint(N_F, N_M):
+    """
+    Линейное ограничение a_1 <= a_2 <= ... <= a_N_F и b_1 <= ... <= b_N_M.
+    Оставляет одну из N_F!·N_M! эквивалентных областей пространства параметров.
+    Возвращает None, если упорядочивать нечего.
+    """
+    n_params = 2 * (N_F + N_M)
+    rows = []
+    for offset, count in ((0, N_F), (2 * N_F, N_M)):
+        for i in range(count - 1):
+            row = np.zeros(n_params)
+            row[offset + 2 * i + 1] = -1.0
+            row[offset + 2 * (i + 1) + 1] = 1.0
+            rows.append(row)
+    if not rows:
+        return None
+    return LinearConstraint(np.array(rows), 0.0, np.inf)
 
+
+def _is_same_solution(p1, p2, N_F, N_M):
+    c1 = canonicalize_params(p1, N_F, N_M)
+    c2 = canonicalize_params(p2, N_F, N_M)
+    pos_close = np.all(np.abs(c1[1::2] - c2[1::2]) <= DEDUP_POS_TOL * L_GLOBAL)
+    values_scale = max(np.max(np.abs(c1[0::2]), initial=0.0), 1.0)
+    values_close = np.all(np.abs(c1[0::2] - c2[0::2]) <= DEDUP_VALUE_RTOL * values_scale)
+    return bool(pos_close and values_close)
+
+
+def deduplicate_solutions(solutions, N_F, N_M):
+    """
+    Отсеивает решения, совпадающие с точностью до перестановки нагрузок.
+    solutions - список пар (error, params); из группы совпадающих
+    остаётся решение с наименьшей ошибкой. Результат отсортирован по ошибке,
+    params приведены к каноническому виду.
+    """
+    unique = []
+    for err, params in sorted(solutions, key=lambda s: s[0]):
+        if any(_is_same_solution(params, u_params, N_F, N_M) for _, u_params in unique):
+            continue
+        unique.append((err, canonicalize_params(params, N_F, N_M)))
+    return unique
+
+
+def _resolve_backend(backend):
+    backend = FORWARD_BACKEND if backend is None else backend
+    if backend not in FORWARD_BACKENDS:
+        raise ValueError(f"Неизвестная прямая модель '{backend}', допустимо: {FORWARD_BACKENDS}")
+    return backend
+
+
+def _compute_w(params, solver, x_target, N_F, N_M, backend=None):
+    if _resolve_backend(backend) == 'analytic':
+        return compute_deflection_from_loads(x_target, params, solver.E, solver.I, solver.length, N_F, N_M)
+    loads = _params_to_loads(params, N_F, N_M)
     x_calc, w_calc = solver.calculate_deflections_test(loads, num_points=len(x_target))
     return w_calc
 
 
+def _compute_w_batch(params_batch, solver, x_target, N_F, N_M, backend=None):
+    """
+    Прогибы для целой популяции параметров: params_batch имеет форму (P, 2*(N_F+N_M)),
+    результат - (P, len(x_target)). Один вызов пакетной прямой модели вместо P вызовов.
+    """
+    params_batch = np.atleast_2d(params_batch)
+    if _resolve_backend(backend) == 'analytic':
+        return compute_deflection_from_loads(
+            x_target, params_batch, solver.E, solver.I, solver.length, N_F, N_M
+        )
+    forces = params_batch[:, 0:2 * N_F:2]
+    force_positions = params_batch[:, 1:2 * N_F:2]
+    moments = params_batch[:, 2 * N_F::2]
+    moment_positions = params_batch[:, 2 * N_F + 1::2]
+    x_calc, w_calc = solver.calculate_deflections_batch(
+        forces, force_positions, moments, moment_positions, num_points=len(x_target)
+    )
+    return w_calc
+
+
+def _init_stats(stats):
+    """
+    Телеметрия оптимизации (если передан словарь stats): счётчики накапливаются
+    по всем запускам, в которые передан один и тот же словарь.
+      n_objective      - вызовы целевой функции;
+      n_forward        - решения прямой задачи (в пакетном режиме - по одному на особь);
+      forward_time_s   - время внутри целевой функции (прямая модель + невязка);
+      optimizer_time_s - остальное время внутри minimize / differential_evolution;
+      status, message  - статус и сообщение итогового (лучшего) запуска.
+    """
+    if stats is not None:
+        for key in ('n_objective', 'n_forward', 'forward_time_s', 'optimizer_time_s'):
+            stats.setdefault(key, 0)
+
+
+def _set_status(stats, res):
+    if stats is not None and res is not None:
+        # у differential_evolution поля status может не быть
+        status = res.get('status')
+        stats['status'] = int(status) if status is not None else None
+        stats['message'] = str(res.get('message', ''))
+
+
+def _param_bounds(N_F, N_M):
+    bounds = []
+    for i in range(N_F):
+        bounds.append((-1e4, 1e4))
+        bounds.append((0.0, L_GLOBAL))
+    for i in range(N_M):
+        bounds.append((-1e4, 1e4))
+        bounds.append((0.0, L_GLOBAL))
+    return bounds
+
+
 ###############################################################################
 # Методы для однократной оптимизации с callback'ом (progress bar)
 ###############################################################################
@@ -78,27 +260,37 @@ def run_single_optimization_with_callback(
         solver, x_target, w_target,
         N_F, N_M,
         init_params,
-        iteration_callback=None
+        iteration_callback=None,
+        max_iter=GLOBAL_MAX_ITER,
+        canonical=False,
+        backend=None,
+        stats=None
 ):
     """
     Запускает оптимизацию 'trust-constr' из init_params,
     обновляя итерации через global_iteration_count и iteration_callback.
+    max_iter - предел итераций (для грубого уровня многоуровневого решения берётся меньше).
+    canonical=True - добавляет ограничение упорядоченности координат нагрузок.
+    backend - прямая модель ('numerical' / 'analytic'), по умолчанию FORWARD_BACKEND.
+    stats - словарь для телеметрии (см. _init_stats).
     """
     import functools
 
-    bounds = []
-    for i in range(N_F):
-        bounds.append((-1e4, 1e4))
-        bounds.append((0.0, L_GLOBAL))
-    for i in range(N_M):
-        bounds.append((-1e4, 1e4))
-        bounds.append((0.0, L_GLOBAL))
+    bounds = _param_bounds(N_F, N_M)
+    _init_stats(stats)
 
     def obj(params_):
-        return objective_function(params_, solver, x_target, w_target, N_F, N_M)
+        if stats is None:
+            return objective_function(params_, solver, x_target, w_target, N_F, N_M, backend=backend)
+        t0 = time.perf_counter()
+        value = objective_function(params_, solver, x_target, w_target, N_F, N_M, backend=backend)
+        stats['forward_time_s'] += time.perf_counter() - t0
+        stats['n_objective'] += 1
+        stats['n_forward'] += 1
+        return value
 
     options = {
-        'maxiter': GLOBAL_MAX_ITER,
+        'maxiter': max_iter,
         'verbose': 0,
         'xtol': GLOBAL_XTOL,
         'gtol': GLOBAL_GTOL,
@@ -114,30 +306,34 @@ def run_single_optimization_with_callback(
     # но trust-constr не всегда даёт много инфы
     wrapped_callback = functools.partial(_trust_constr_callback, user_callback=iteration_callback)
 
+    constraints = ()
+    if canonical:
+        init_params = canonicalize_params(init_params, N_F, N_M)
+        ordering = _ordering_constraint(N_F, N_M)
+        if ordering is not None:
+            constraints = [ordering]
+
+    if stats is not None:
+        forward_before = stats['forward_time_s']
+        t_start = time.perf_counter()
+
     res = minimize(
         obj,
         init_params,
         method='trust-constr',
         bounds=bounds,
+        constraints=constraints,
         callback=wrapped_callback,
         options=options
     )
 
+    if stats is not None:
+        stats['optimizer_time_s'] += (time.perf_counter() - t_start) - (stats['forward_time_s'] - forward_before)
+        _set_status(stats, res)
+
     opt_params = res.x
     final_error = res.fun
-    # Формируем loads
-    loads = []
-    idx = 0
-    for i in range(N_F):
-        F_i = opt_params[idx]
-        a_i = opt_params[idx + 1]
-        loads.append({'type': 'point', 'value': F_i, 'position': a_i})
-        idx += 2
-    for i in range(N_M):
-        M_i = opt_params[idx]
-        b_i = opt_params[idx + 1]
-        loads.append({'type': 'moment', 'value': M_i, 'position': b_i})
-        idx += 2
+    loads = _params_to_loads(opt_params, N_F, N_M)
 
     return opt_params, loads, final_error, res
 
@@ -150,47 +346,256 @@ def run_multistart_optimization(
         N_F, N_M,
         n_starts=5,
         iteration_callback=None,
-        start_callback=None
+        start_callback=None,
+        canonical=False,
+        unique_solutions=None,
+        backend=None,
+        stats=None
 ):
     """
     Внешний цикл по числу запусков.
     iteration_callback(iter_num) - вызывается при каждой итерации trust-constr;
     start_callback(start_i, n_starts) - вызывается при начале очередного запуска.
+    canonical=True - поиск только среди упорядоченных по координате нагрузок
+    (одна из N_F!·N_M! эквивалентных областей).
+    unique_solutions - если передан список, в него записываются различные
+    (с точностью до перестановки) найденные минимумы в виде (error, params).
+    backend - прямая модель ('numerical' / 'analytic'), по умолчанию FORWARD_BACKEND.
+    stats - словарь для телеметрии (см. _init_stats), суммируется по всем стартам.
     """
     best_error = np.inf
     best_params = None
     best_loads = None
     best_res = None
+    solutions = []
 
     for attempt_i in range(n_starts):
         if start_callback:
             start_callback(attempt_i + 1, n_starts)
 
         # Генерируем случайное нач. приближение
-        init_p = []
-        for i in range(N_F):
-            Fi = np.random.uniform(-1000, 1000)
-            ai = np.random.uniform(0, L_GLOBAL)
-            init_p.append(Fi)
-            init_p.append(ai)
-        for i in range(N_M):
-            Mi = np.random.uniform(-1000, 1000)
-            bi = np.random.uniform(0, L_GLOBAL)
-            init_p.append(Mi)
-            init_p.append(bi)
-        init_p = np.array(init_p, dtype=float)
+        init_p = _random_init_params(N_F, N_M, canonical=canonical)
 
         # Запуск одиночной оптимизации
         params, loads, err, res = run_single_optimization_with_callback(
             solver, x_target, w_target,
             N_F, N_M,
             init_p,
-            iteration_callback=iteration_callback
+            iteration_callback=iteration_callback,
+            canonical=canonical,
+            backend=backend,
+            stats=stats
         )
+        solutions.append((err, params))
         if err < best_error:
             best_error = err
             best_params = params
             best_loads = loads
             best_res = res
 
+    if unique_solutions is not None:
+        unique_solutions.extend(deduplicate_solutions(solutions, N_F, N_M))
+    _set_status(stats, best_res)
+
     return best_params, best_loads, best_error, (best_res.nit if best_res else 0)
+
+
+###############################################################################
+# Многоуровневая (coarse-to-fine) оптимизация
+###############################################################################
+def _decimate_target(x_target, w_target, n_coarse):
+    """
+    Прореживает целевую кривую до n_coarse равномерных точек на [x_0, x_end].
+    Прямая модель строит свою сетку как linspace по длине балки, поэтому
+    целевые значения на грубой сетке берутся линейной интерполяцией.
+    """
+    n_coarse = min(n_coarse, len(x_target))
+    x_coarse = np.linspace(x_target[0], x_target[-1], n_coarse)
+    w_coarse = np.interp(x_coarse, x_target, w_target)
+    return x_coarse, w_coarse
+
+
+def run_multilevel_optimization(
+        solver, x_target, w_target,
+        N_F, N_M,
+        n_starts=5,
+        n_coarse=COARSE_N_POINTS,
+        n_refine=N_REFINE,
+        iteration_callback=None,
+        start_callback=None,
+        canonical=False,
+        backend=None,
+        coarse_backend=COARSE_BACKEND,
+        stats=None
+):
+    """
+    Двухуровневый многостарт:
+    1) все n_starts запусков решаются на прореженной цели (n_coarse точек);
+    2) лучшие n_refine различных (с точностью до перестановки нагрузок)
+       кандидатов доуточняются на полной сетке x_target.
+
+    Ошибка и итоговые параметры считаются на полной сетке, поэтому результат
+    сопоставим с run_multistart_optimization и возвращается в том же виде:
+    (best_params, best_loads, best_error, nit).
+    start_callback вызывается для каждого запуска обоих уровней. Пока грубый
+    уровень не закончен, общее число запусков оценивается как n_starts + n_refine;
+    если после отсева совпадающих кандидатов их осталось меньше, на тонком
+    уровне передаётся уточнённое число.
+    backend - прямая модель тонкого уровня ('numerical' / 'analytic'), по умолчанию FORWARD_BACKEND.
+    coarse_backend - прямая модель грубого уровня (по умолчанию COARSE_BACKEND).
+    stats - словарь для телеметрии (см. _init_stats), суммируется по обоим уровням.
+    """
+    x_coarse, w_coarse = _decimate_target(x_target, w_target, n_coarse)
+    n_refine = max(1, min(n_refine, n_starts))
+    total_runs = n_starts + n_refine
+
+    # 1. Грубый уровень: все старты
+    candidates = []
+    for attempt_i in range(n_starts):
+        if start_callback:
+            start_callback(attempt_i + 1, total_runs)
+
+        init_p = _random_init_params(N_F, N_M, canonical=canonical)
+        params, loads, err, res = run_single_optimization_with_callback(
+            solver, x_coarse, w_coarse,
+            N_F, N_M,
+            init_p,
+            iteration_callback=iteration_callback,
+            max_iter=COARSE_MAX_ITER,
+            canonical=canonical,
+            backend=coarse_backend,
+            stats=stats
+        )
+        candidates.append((err, params))
+
+    # Старты, сошедшиеся в один и тот же бассейн, не доуточняем повторно
+    candidates = deduplicate_solutions(candidates, N_F, N_M)[:n_refine]
+    total_runs = n_starts + len(candidates)
+
+    # 2. Тонкий уровень: доуточнение лучших кандидатов на полной сетке
+    best_error = np.inf
+    best_params = None
+    best_loads = None
+    best_res = None
+
+    for refine_i, (_, coarse_params) in enumerate(candidates):
+        if start_callback:
+            start_callback(n_starts + refine_i + 1, total_runs)
+
+        params, loads, err, res = run_single_optimization_with_callback(
+            solver, x_target, w_target,
+            N_F, N_M,
+            coarse_params,
+            iteration_callback=iteration_callback,
+            canonical=canonical,
+            backend=backend,
+            stats=stats
+        )
+        if err < best_error:
+            best_error = err
+            best_params = params
+            best_loads = loads
+            best_res = res
+    _set_status(stats, best_res)
+
+    return best_params, best_loads, best_error, (best_res.nit if best_res else 0)
+
+
+###############################################################################
+# Глобальный популяционный поиск (дифференциальная эволюция) + локальная доводка
+###############################################################################
+def run_global_optimization(
+        solver, x_target, w_target,
+        N_F, N_M,
+        popsize=GLOBAL_DE_POPSIZE,
+        maxiter=GLOBAL_DE_MAXITER,
+        polish=True,
+        iteration_callback=None,
+        start_callback=None,
+        backend=None,
+        stats=None
+):
+    """
+    Дифференциальная эволюция по тем же границам, что и многостарт.
+    Целевая функция векторизована (vectorized=True): каждое поколение
+    считается одним вызовом пакетной прямой модели (solver.calculate_deflections_batch
+    или аналитической compute_deflection_from_loads).
+    Лучшая особь доводится локальным 'trust-constr' (polish=True).
+
+    Возвращает то же, что run_multistart_optimization:
+    (best_params, best_loads, best_error, nit), где nit - число поколений
+    плюс итерации локальной доводки.
+    start_callback(i, 2) вызывается перед глобальной и перед локальной стадией.
+    backend - прямая модель ('numerical' / 'analytic'), по умолчанию FORWARD_BACKEND.
+    stats - словарь для телеметрии (см. _init_stats), включая локальную доводку.
+    """
+    bounds = _param_bounds(N_F, N_M)
+    _init_stats(stats)
+
+    def obj_batch(params_t):
+        # differential_evolution передаёт популяцию в виде (n_params, P)
+        t0 = time.perf_counter()
+        w_calc = _compute_w_batch(params_t.T, solver, x_target, N_F, N_M, backend=backend)
+        value = np.sum((w_calc - w_target) ** 2, axis=1)
+        if stats is not None:
+            stats['forward_time_s'] += time.perf_counter() - t0
+            stats['n_objective'] += 1
+            stats['n_forward'] += params_t.shape[1]
+        return value
+
+    global global_iteration_count
+    global_iteration_count = 0
+
+    def de_callback(xk, convergence=None):
+        global global_iteration_count
+        global_iteration_count += 1
+        if iteration_callback is not None:
+            iteration_callback(global_iteration_count)
+
+    n_stages = 2 if polish else 1
+    if start_callback:
+        start_callback(1, n_stages)
+
+    if stats is not None:
+        forward_before = stats['forward_time_s']
+        t_start = time.perf_counter()
+
+    de_res = differential_evolution(
+        obj_batch,
+        bounds,
+        popsize=popsize,
+        maxiter=maxiter,
+        tol=GLOBAL_DE_TOL,
+        polish=False,
+        vectorized=True,
+        updating='deferred',
+        callback=de_callback
+    )
+
+    if stats is not None:
+        stats['optimizer_time_s'] += (time.perf_counter() - t_start) - (stats['forward_time_s'] - forward_before)
+        _set_status(stats, de_res)
+
+    best_params = de_res.x
+    best_error = de_res.fun
+    best_loads = _params_to_loads(best_params, N_F, N_M)
+    nit = de_res.nit
+
+    if polish:
+        if start_callback:
+            start_callback(2, n_stages)
+        params, loads, err, res = run_single_optimization_with_callback(
+            solver, x_target, w_target,
+            N_F, N_M,
+            best_params,
+            iteration_callback=iteration_callback,
+            backend=backend,
+            stats=stats
+        )
+        nit += res.nit
+        if err < best_error:
+            best_params, best_loads, best_error = params, loads, err
+        else:
+            _set_status(stats, de_res)
+
+    return best_params, best_loads, best_error, nit
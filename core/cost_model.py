@@ -0,0 +1,186 @@
+import copy
+import json
+import os
+from statistics import NormalDist
+
+import numpy as np
+
+from core.result_store import is_timed_out
+
+# Файл модели стоимости (пишет analythis.cost_model_analysis)
+COST_MODEL_PATH = os.path.join("results", "cost_model.json")
+# Параметры задания, от которых зависит стоимость, в порядке столбцов модели
+COST_FEATURES = ('N_modes', 'N_F', 'N_M', 'n_starts')
+# Квантиль оценки времени при подборе настроек под бюджет (запас на разброс)
+BUDGET_QUANTILE = 0.9
+# Цели модели и показатель при n_starts, если он в данных не меняется: время растёт
+# линейно (старты идут последовательно), итерации лучшего старта от n_starts не зависят
+COST_TARGETS = {'time_s': 1.0, 'iterations': 0.0}
+# Минимум разных пар (N_F, N_M) в истории, чтобы подгонять модель по ней
+MIN_FIT_SIZES = 3
+# Априорная модель, пока нет ни файла модели, ни истории: CostModel.fit по 16000 записям
+# исходного исследования (core/data/parameter_study.json, n_starts = 1), округлено
+PRIOR_TERMS = {
+    'time_s': {
+        'intercept': 0.18,
+        'exponents': {'N_modes': 0.02, 'N_F': 0.86, 'N_M': 0.34, 'n_starts': 1.0},
+        'resid_std': 0.62,
+    },
+    'iterations': {
+        'intercept': 6.47,
+        'exponents': {'N_modes': 0.02, 'N_F': 0.18, 'N_M': -0.20, 'n_starts': 0.0},
+        'resid_std': 0.47,
+    },
+}
+
+
+def cost_features(N_modes, N_F, N_M, n_starts):
+    """
+    Логарифмические признаки модели: N_F и N_M могут быть нулевыми, поэтому log(1 + N).
+    """
+    return np.stack(np.broadcast_arrays(
+        np.log(np.asarray(N_modes, dtype=float)),
+        np.log1p(np.asarray(N_F, dtype=float)),
+        np.log1p(np.asarray(N_M, dtype=float)),
+        np.log(np.asarray(n_starts, dtype=float)),
+    ), axis=-1)
+
+
+def _to_float(value):
+    """Число из записи; пропуск или нечисловая строка - NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class CostModel:
+    """
+    Степенная модель стоимости одной задачи (многостартовой оптимизации):
+        value ≈ C * N_modes^a * (1 + N_F)^b * (1 + N_M)^c * n_starts^d
+    отдельно для time_s и iterations, с логнормальным разбросом (resid_std - СКО
+    остатка в логарифмах). terms = {'time_s': {...}, 'iterations': {...}}, где
+    каждый член - {'intercept': log C, 'exponents': {признак: показатель}, 'resid_std': s}.
+    """
+
+    def __init__(self, terms, n_records=0):
+        self.terms = terms
+        self.n_records = n_records
+
+    @classmethod
+    def fit(cls, records):
+        """
+        МНК в логарифмах по записям отдельных задач: словари с ключами COST_FEATURES
+        и целями COST_TARGETS (n_starts по умолчанию 1; в логах GUI числа - строки).
+        Записи с пропусками и неположительными значениями, а также прерванные по
+        пределу времени (timed_out) пропускаются. Показатель
+        при признаке, который в данных не меняется, не подгоняется (он не определён):
+        для n_starts он берётся из COST_TARGETS, для остальных - 0.
+        """
+        names = COST_FEATURES + tuple(COST_TARGETS)
+        data = np.array([[_to_float(rec.get(name, 1 if name == 'n_starts' else None))
+                          for name in names] for rec in records if not is_timed_out(rec)],
+                        dtype=float).reshape(-1, len(names))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features = cost_features(*data[:, :len(COST_FEATURES)].T)
+        terms = {}
+        for j, (target, fixed_starts) in enumerate(COST_TARGETS.items(), start=len(COST_FEATURES)):
+            keep = np.isfinite(features).all(axis=1) & np.isfinite(data[:, j]) & (data[:, j] > 0)
+            F, y = features[keep], np.log(data[keep, j])
+            pinned = {name: fixed_starts if name == 'n_starts' else 0.0
+                      for k, name in enumerate(COST_FEATURES) if len(np.unique(F[:, k])) <= 1}
+            free = [k for k, name in enumerate(COST_FEATURES) if name not in pinned]
+            y = y - F[:, 3] * pinned.get('n_starts', 0.0)
+            A = np.column_stack([np.ones(len(y)), F[:, free]])
+            beta = np.linalg.lstsq(A, y, rcond=None)[0]
+            resid = y - A @ beta
+            exponents = dict(pinned, **{COST_FEATURES[k]: b for k, b in zip(free, beta[1:])})
+            terms[target] = {
+                'intercept': float(beta[0]),
+                'exponents': {name: float(exponents[name]) for name in COST_FEATURES},
+                # остаток с интерцептом центрирован; без лишних степеней свободы - 0
+                'resid_std': float(np.sqrt(resid @ resid / max(len(y) - A.shape[1], 1))),
+            }
+        return cls(terms, n_records=len(data))
+
+    @classmethod
+    def prior(cls):
+        """
+        Априорная модель PRIOR_TERMS (n_records = 0 - своих данных нет).
+        """
+        return cls(copy.deepcopy(PRIOR_TERMS))
+
+    @classmethod
+    def load(cls, path=COST_MODEL_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['terms'], data.get('n_records', 0))
+
+    def save(self, path=COST_MODEL_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'features': list(COST_FEATURES), 'terms': self.terms,
+                       'n_records': self.n_records}, f, indent=2, ensure_ascii=False)
+
+    def _predict(self, target, N_F, N_M, N_modes, n_starts, quantile):
+        term = self.terms[target]
+        coef = np.array([term['exponents'][name] for name in COST_FEATURES])
+        log_value = term['intercept'] + cost_features(N_modes, N_F, N_M, n_starts) @ coef
+        if quantile != 0.5:
+            log_value = log_value + NormalDist().inv_cdf(quantile) * term['resid_std']
+        return np.exp(log_value)
+
+    def predict_time(self, N_F, N_M, N_modes=1, n_starts=1, quantile=0.5):
+        """
+        Оценка длительности, с: медиана (quantile=0.5) или заданный квантиль.
+        Аргументы могут быть массивами (считается поэлементно).
+        """
+        return self._predict('time_s', N_F, N_M, N_modes, n_starts, quantile)
+
+    def predict_iterations(self, N_F, N_M, N_modes=1, n_starts=1, quantile=0.5):
+        return self._predict('iterations', N_F, N_M, N_modes, n_starts, quantile)
+
+    def max_n_starts(self, N_F, N_M, N_modes, budget_s, quantile=BUDGET_QUANTILE, limit=50):
+        """
+        Наибольшее число стартов (не больше limit), укладывающееся в бюджет budget_s
+        по квантилю quantile оценки времени; 0 - не укладывается даже один старт.
+        """
+        starts = np.arange(1, limit + 1)
+        fits = self.predict_time(N_F, N_M, N_modes, starts, quantile) <= budget_s
+        return int(starts[fits].max()) if fits.any() else 0
+
+    def pick_within_budget(self, candidates, budget_s, quantile=BUDGET_QUANTILE):
+        """
+        Отбор вариантов настроек (словари с ключами из COST_FEATURES), чья оценка
+        времени укладывается в budget_s. Возвращает [(оценка, вариант), ...]
+        по убыванию оценки - первым идёт самый "дорогой" из допустимых.
+        """
+        chosen = []
+        for cand in candidates:
+            t = float(self.predict_time(cand['N_F'], cand['N_M'], cand.get('N_modes', 1),
+                                        cand.get('n_starts', 1), quantile))
+            if t <= budget_s:
+                chosen.append((t, cand))
+        return sorted(chosen, key=lambda item: -item[0])
+
+
+def load_cost_model(path=COST_MODEL_PATH, history=()):
+    """
+    Модель стоимости для планирования расчёта: сохранённая analythis (path), если
+    она есть; иначе подгонка по записям history (если в них не меньше MIN_FIT_SIZES
+    разных пар N_F, N_M); иначе CostModel.prior().
+    history может быть ленивым итератором - он читается только при отсутствии path.
+    """
+    if os.path.exists(path):
+        return CostModel.load(path)
+    sizes = set()
+
+    def tracked(records):
+        for rec in records:
+            sizes.add((rec.get('N_F'), rec.get('N_M')))
+            yield rec
+
+    model = CostModel.fit(tracked(history))
+    return model if len(sizes) >= MIN_FIT_SIZES else CostModel.prior()
@@ -0,0 +1,37 @@
+import json
+import os
+
+import numpy as np
+
+from core.cost_model import PRIOR_TERMS, CostModel
+
+STUDY_PATH = os.path.join(os.path.dirname(__file__), 'data', 'parameter_study.json')
+
+
+def test_constant_feature_gets_zero_exponent():
+    rng = np.random.default_rng(0)
+    records = [dict(N_modes=m, N_F=f, N_M=3, time_s=0.1 * (1 + f) ** 0.9 * np.exp(rng.normal(0, 0.1)),
+                    iterations=300 * np.exp(rng.normal(0, 0.3)))
+               for m in range(1, 5) for f in range(1, 21)]
+    model = CostModel.fit(records)
+    for term in model.terms.values():
+        assert term['exponents']['N_M'] == 0.0
+    assert abs(model.terms['time_s']['exponents']['N_F'] - 0.9) < 0.05
+
+
+def test_prior_matches_original_study():
+    with open(STUDY_PATH, 'r', encoding='utf-8') as f:
+        model = CostModel.fit(json.load(f))
+    for target, prior in PRIOR_TERMS.items():
+        term = model.terms[target]
+        assert abs(term['intercept'] - prior['intercept']) < 0.01
+        for name, value in prior['exponents'].items():
+            assert abs(term['exponents'][name] - value) < 0.01
+
+
+def test_fit_skips_timed_out():
+    rng = np.random.default_rng(1)
+    records = [dict(N_modes=1, N_F=f, N_M=m, time_s=0.1 * (1 + f) * np.exp(rng.normal(0, 0.1)), iterations=200)
+               for f in range(1, 6) for m in range(1, 6)]
+    capped = [dict(rec, time_s=900.0, timed_out=True) for rec in records[:5]]
+    assert CostModel.fit(records + capped).terms == CostModel.fit(records).terms
@@ -0,0 +1,149 @@
+import os
+import time
+import collections
+import multiprocessing
+
+import numpy as np
+from PySide6.QtCore import QObject, Signal
+
+import core.calc_module as cm
+from core.beam_solver import BeamSolver
+
+# ---------------------- Состояние процесса-работника -----------------------
+# Решатель создаётся один раз на процесс пула (см. _init_job_worker)
+_JOB_STATE = {}
+
+
+def _init_job_worker():
+    """
+    Инициализатор процесса пула: решатель строится один раз на процесс,
+    ГСЧ пересевается, чтобы работники не генерировали одинаковые цели.
+    """
+    np.random.seed()
+    _JOB_STATE['solver'] = BeamSolver(cm.L_GLOBAL, cm.E_GLOBAL, {'I': cm.I_GLOBAL, 'h': 0.1})
+
+
+def solve_job(job):
+    """
+    Одно задание очереди: новая целевая кривая и многостартовая оптимизация.
+    job - словарь с ключами N_F, N_M, N_modes, n_starts, max_amplitude, n_points.
+    Возвращает job, дополненный целевой кривой (x_target, w_target), итогами
+    оптимизации и восстановленными перемещениями (x_calc, w_calc).
+    """
+    if not _JOB_STATE:
+        _init_job_worker()
+    solver = _JOB_STATE['solver']
+
+    x_target, w_target = cm.generate_random_displacements(
+        n=job['n_points'],
+        L=cm.L_GLOBAL,
+        N_modes=job['N_modes'],
+        max_amplitude=job['max_amplitude']
+    )
+
+    start_time = time.time()
+    best_params, best_loads, best_error, best_nit = cm.run_multistart_optimization(
+        solver=solver,
+        x_target=x_target,
+        w_target=w_target,
+        N_F=job['N_F'],
+        N_M=job['N_M'],
+        n_starts=job['n_starts']
+    )
+    elapsed_time = time.time() - start_time
+    x_calc, w_calc = solver.calculate_deflections_test(best_loads, num_points=len(x_target))
+
+    return dict(
+        job,
+        x_target=x_target,
+        w_target=w_target,
+        best_params=best_params,
+        best_loads=best_loads,
+        best_error=best_error,
+        best_nit=best_nit,
+        elapsed_time=elapsed_time,
+        x_calc=x_calc,
+        w_calc=w_calc,
+        pid=os.getpid()
+    )
+
+
+class JobQueue(QObject):
+    """
+    Очередь заданий обратной задачи на пуле процессов (по умолчанию - по числу ядер).
+
+    submit() возвращает номер задания; по завершении приходит job_finished(номер,
+    результат solve_job) или job_failed(номер, текст ошибки). Пулу передаётся не
+    больше заданий, чем в нём процессов: остальные ждут в очереди JobQueue, и их
+    можно отменить (cancel_pending). Колбэки пула выполняются в его служебном потоке,
+    завершение доставляется в поток интерфейса через очередь событий. Пул создаётся
+    при первом задании; shutdown() останавливает и выполняемые задания.
+    """
+    job_finished = Signal(int, object)
+    job_failed = Signal(int, str)
+    # Завершение задания: (номер, результат, текст ошибки) из служебного потока пула
+    _job_done = Signal(int, object, str)
+
+    def __init__(self, max_workers=None):
+        super().__init__()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+        self._waiting = collections.deque()  # (номер, задание), ещё не переданные пулу
+        self._running = set()                # номера заданий, выполняемых пулом
+        self._next_id = 1
+        self._job_done.connect(self._on_done)
+
+    def submit(self, job):
+        job_id = self._next_id
+        self._next_id += 1
+        self._waiting.append((job_id, job))
+        self._dispatch()
+        return job_id
+
+    def _dispatch(self):
+        while self._waiting and len(self._running) < self.max_workers:
+            if self._pool is None:
+                # spawn: процесс с потоками Qt небезопасно копировать через fork
+                self._pool = multiprocessing.get_context('spawn').Pool(
+                    self.max_workers, initializer=_init_job_worker
+                )
+            job_id, job = self._waiting.popleft()
+            self._running.add(job_id)
+            self._pool.apply_async(
+                solve_job, (job,),
+                callback=lambda result, job_id=job_id: self._job_done.emit(job_id, result, ''),
+                error_callback=lambda error, job_id=job_id: self._job_done.emit(
+                    job_id, None, str(error) or type(error).__name__)
+            )
+
+    def _on_done(self, job_id, result, error):
+        if job_id not in self._running:
+            return  # пул уже остановлен
+        self._running.discard(job_id)
+        if error:
+            self.job_failed.emit(job_id, error)
+        else:
+            self.job_finished.emit(job_id, result)
+        self._dispatch()
+
+    def is_running(self, job_id):
+        """Задание передано процессу пула."""
+        return job_id in self._running
+
+    def cancel_pending(self):
+        """Отменяет ещё не начатые задания; возвращает их номера."""
+        cancelled = [job_id for job_id, _ in self._waiting]
+        self._waiting.clear()
+        return cancelled
+
+    def shutdown(self):
+        """
+        Отменяет ожидающие задания и завершает процессы пула вместе с выполняемыми
+        (иначе выход из программы ждал бы их окончания); их результаты теряются.
+        """
+        self._waiting.clear()
+        self._running.clear()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
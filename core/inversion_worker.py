@@ -0,0 +1,92 @@
+import time
+
+from PySide6.QtCore import QThread, Signal
+
+from core.calc_module import run_multistart_optimization
+
+# Минимальный интервал между сигналами прогресса, с (не чаще 20 раз в секунду)
+PROGRESS_INTERVAL = 0.05
+
+
+class InversionCancelled(Exception):
+    """Многостартовая оптимизация прервана по запросу отмены."""
+
+
+class InversionWorker(QThread):
+    """
+    Многостартовая оптимизация обратной задачи в отдельном потоке.
+
+    Колбэки оптимизатора только запоминают номер итерации и сверяют время:
+    сигнал progress(итерация, запуск, всего запусков) отправляется не чаще
+    PROGRESS_INTERVAL, поэтому ни оптимизатор, ни очередь событий интерфейса
+    не тратят время на каждую итерацию. cancel() прерывает текущий запуск
+    (StopIteration из колбэка trust-constr) и не даёт начаться следующим.
+    """
+    progress = Signal(int, int, int)
+    result_ready = Signal(object)
+    cancelled = Signal()
+    failed = Signal(str)
+
+    def __init__(self, solver, x_target, w_target, N_F, N_M, n_starts):
+        super().__init__()
+        self.solver = solver
+        self.x_target = x_target
+        self.w_target = w_target
+        self.N_F = N_F
+        self.N_M = N_M
+        self.n_starts = n_starts
+        self._cancel_requested = False
+        self._start_i = 0
+        self._last_emit = 0.0
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def _iteration_callback(self, iter_num):
+        if self._cancel_requested:
+            raise StopIteration
+        now = time.perf_counter()
+        if now - self._last_emit >= PROGRESS_INTERVAL:
+            self._last_emit = now
+            self.progress.emit(iter_num, self._start_i, self.n_starts)
+
+    def _start_callback(self, start_i, total_starts):
+        if self._cancel_requested:
+            raise InversionCancelled
+        self._start_i = start_i
+        self._last_emit = time.perf_counter()
+        self.progress.emit(0, start_i, total_starts)
+
+    def run(self):
+        start_time = time.time()
+        try:
+            best_params, best_loads, best_error, best_nit = run_multistart_optimization(
+                solver=self.solver,
+                x_target=self.x_target,
+                w_target=self.w_target,
+                N_F=self.N_F,
+                N_M=self.N_M,
+                n_starts=self.n_starts,
+                iteration_callback=self._iteration_callback,
+                start_callback=self._start_callback
+            )
+            if self._cancel_requested:
+                raise InversionCancelled
+            elapsed_time = time.time() - start_time
+            x_calc, w_calc = self.solver.calculate_deflections_test(best_loads, num_points=len(self.x_target))
+        except InversionCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        self.result_ready.emit({
+            'best_params': best_params,
+            'best_loads': best_loads,
+            'best_error': best_error,
+            'best_nit': best_nit,
+            'elapsed_time': elapsed_time,
+            'x_calc': x_calc,
+            'w_calc': w_calc,
+        })
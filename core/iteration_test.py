@@ -1,15 +1,31 @@
 # parameter_study_parallel.py
 
 import os
-import json
 import time
+import argparse
+import contextlib
 import datetime
+import itertools
+import collections
+import threading
+import multiprocessing
 import numpy as np
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 
+try:
+    import resource  # только POSIX
+except ImportError:
+    resource = None
+
 import core.calc_module as cm  # ваш модуль расчётов
 from core.beam_solver import BeamSolver
+from core.result_store import ResultStore, compact, completed_keys, import_json, read_records
+from core.adaptive_study import AdaptiveScheduler
+from core.work_queue import (WorkQueue, QueueServer, HEARTBEAT_INTERVAL, default_worker_id,
+                             open_work_queue, parse_address)
+from core.study_schedule import lpt_order, makespan_report
+from core.cost_model import COST_MODEL_PATH, load_cost_model
 
 # ---------------------- Параметры исследования -----------------------------
 N_POINTS      = 200
@@ -19,19 +35,62 @@ MODES_RANGE   = range(1, 5)    # 1…5
 FORCE_RANGE   = range(1, 21)   # 1…30
 MOMENT_RANGE  = range(1, 21)   # 1…30
 
+# Старый формат (один JSON-массив) - только для однократного импорта
 JSON_PATH = os.path.join("data", "parameter_study.json")
+# Хранилище результатов: JSON Lines, только дозапись
+STORE_PATH = os.path.join("data", "parameter_study.jsonl")
+# Сколько записей копить перед сбросом на диск (flush + fsync)
+STORE_BATCH = 20
+# Сколько заданий держать в очереди пула на одного работника
+IN_FLIGHT_PER_WORKER = 4
+# Очередь заданий для распределённого режима (coordinator/worker)
+QUEUE_PATH = os.path.join("data", "study_queue.sqlite")
+# Период опроса очереди координатором и простаивающими работниками, с
+QUEUE_POLL_INTERVAL = 5.0
+# Переменная окружения с ключом доступа к серверу очереди (--listen/--connect)
+QUEUE_AUTHKEY_ENV = "STUDY_QUEUE_AUTHKEY"
+# Предел времени одной оптимизации, с (None - без ограничения). Проверяется
+# на каждой итерации trust-constr; результат прерванного запуска - лучшая
+# найденная к этому моменту точка, в записи помечается timed_out
+TASK_TIMEOUT = 900.0
+
+# ---------------------- Состояние процесса-работника -----------------------
+# Заполняется один раз в _init_worker (или лениво при первом задании);
+# импорт модуля не имеет побочных эффектов, что важно для start method 'spawn'
+_WORKER_STATE = {}
+
+
+def _init_worker(task_timeout=TASK_TIMEOUT):
+    """
+    Инициализатор процесса пула: решатель, сетка и синусоидальные моды
+    строятся один раз на процесс, а не на каждое задание. ГСЧ пересевается,
+    чтобы работники, созданные через fork, не генерировали одинаковые цели.
+    """
+    np.random.seed()
+    _WORKER_STATE['task_timeout'] = task_timeout
+    x_t = np.linspace(0, cm.L_GLOBAL, N_POINTS + 2)
+    n_modes_max = max(MODES_RANGE)
+    _WORKER_STATE['solver'] = BeamSolver(cm.L_GLOBAL, cm.E_GLOBAL, {"I": cm.I_GLOBAL, "h": 0.1})
+    _WORKER_STATE['x_target'] = x_t
+    _WORKER_STATE['modes'] = np.sin(np.outer(np.arange(1, n_modes_max + 1), np.pi * x_t / cm.L_GLOBAL))
+
+
+def _worker_state():
+    if not _WORKER_STATE:
+        _init_worker()
+    return _WORKER_STATE
 
-# ---------------------- Подготовка каталога/файла --------------------------
-os.makedirs("data", exist_ok=True)
-if os.path.exists(JSON_PATH):
-    try:
-        with open(JSON_PATH, "r", encoding="utf-8") as f:
-            results = json.load(f)
-    except json.JSONDecodeError:
-        print(f"WARNING: {JSON_PATH} повреждён, перезаписываем.")
-        results = []
-else:
-    results = []
+
+def _peak_rss_mb():
+    """
+    Пиковый RSS процесса-работника, МБ (максимум за всё время жизни процесса,
+    а не только за текущее задание). None там, где модуля resource нет.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss: КБ в Linux, байты в macOS
+    scale = 1.0 / 1024 ** 2 if os.uname().sysname == 'Darwin' else 1.0 / 1024
+    return float(f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale:.1f}")
 
 
 def run_one(task):
@@ -40,18 +99,28 @@ def run_one(task):
     task = (N_modes, N_F, N_M, rep)
     """
     N_modes, N_F, N_M, rep = task
+    state = _worker_state()
 
-    # 1) Генерация целевых перемещений
-    x_t, w_t = cm.generate_random_displacements(
-        n=N_POINTS,
-        L=cm.L_GLOBAL,
-        N_modes=N_modes,
-        max_amplitude=MAX_AMPLITUDE
-    )
+    # 1) Генерация целевых перемещений (та же суперпозиция мод, что и
+    #    в cm.generate_random_displacements, но на готовых модах)
+    x_t = state['x_target']
+    amplitudes = np.random.uniform(-MAX_AMPLITUDE, MAX_AMPLITUDE, N_modes)
+    w_t = amplitudes @ state['modes'][:N_modes]
 
-    # 2) Оптимизация (берём fresh BeamSolver внутри процесса)
-    solver = BeamSolver(cm.L_GLOBAL, cm.E_GLOBAL, {"I": cm.I_GLOBAL, "h": 0.1})
+    # 2) Оптимизация (решатель создан один раз на процесс)
+    solver = state['solver']
     t0 = time.time()
+    timeout = state.get('task_timeout')
+    timed_out = False
+
+    def check_deadline(_):
+        # StopIteration из callback останавливает minimize с текущей точкой
+        nonlocal timed_out
+        if time.time() - t0 > timeout:
+            timed_out = True
+            raise StopIteration
+
+    stats = {}
     _, _, best_err, best_nit = cm.run_multistart_optimization(
         solver=solver,
         x_target=x_t,
@@ -59,8 +128,9 @@ def run_one(task):
         N_F=N_F,
         N_M=N_M,
         n_starts=1,
-        iteration_callback=None,
-        start_callback=None
+        iteration_callback=check_deadline if timeout else None,
+        start_callback=None,
+        stats=stats
     )
     elapsed = time.time() - t0
 
@@ -73,42 +143,353 @@ def run_one(task):
         "repeat": rep + 1,
         "error": float(f"{best_err:.6e}"),
         "iterations": int(best_nit),
-        "time_s": float(f"{elapsed:.3f}")
+        "time_s": float(f"{elapsed:.3f}"),
+        "timed_out": timed_out,
+        # Телеметрия
+        "n_objective": stats['n_objective'],
+        "n_forward": stats['n_forward'],
+        "forward_time_s": float(f"{stats['forward_time_s']:.3f}"),
+        "optimizer_time_s": float(f"{stats['optimizer_time_s']:.3f}"),
+        "status": stats.get('status'),
+        "message": stats.get('message'),
+        "peak_rss_mb": _peak_rss_mb(),
+        "pid": os.getpid()
     }
 
 
+def task_store_key(task):
+    """
+    Ключ задания в хранилище: (N_modes, N_F, N_M, repeat), repeat в записи нумеруется с 1.
+    """
+    N_modes, N_F, N_M, rep = task
+    return (N_modes, N_F, N_M, rep + 1)
+
+
+def iter_tasks(skip_keys=frozenset()):
+    """
+    Ленивый перебор заданий исследования, без уже выполненных (skip_keys).
+    """
+    for task in itertools.product(MODES_RANGE, FORCE_RANGE, MOMENT_RANGE, range(N_REPEATS)):
+        if task_store_key(task) not in skip_keys:
+            yield task
+
+
+def config_order(order='lpt', cost_model=None):
+    """
+    Порядок выдачи конфигураций (N_modes, N_F, N_M): 'grid' - исходный порядок сетки,
+    'lpt' - по убыванию медианы времени по модели стоимости cost_model (см.
+    core.cost_model.load_cost_model), чтобы самые долгие задания не оказались в конце
+    расчёта на фоне простаивающих ядер. Длительность зависит только от конфигурации,
+    поэтому сортируется список конфигураций, а не заданий.
+    """
+    configs = list(itertools.product(MODES_RANGE, FORCE_RANGE, MOMENT_RANGE))
+    if order == 'grid':
+        return configs
+    n_modes, n_f, n_m = np.array(configs).T
+    return lpt_order(configs, cost_model.predict_time(n_f, n_m, n_modes))
+
+
+def ordered_tasks(configs, skip_keys=frozenset()):
+    """
+    Ленивый перебор заданий в порядке конфигураций configs (повторы подряд),
+    без уже выполненных (skip_keys). Для порядка сетки совпадает с iter_tasks.
+    """
+    for config in configs:
+        for rep in range(N_REPEATS):
+            task = (*config, rep)
+            if task_store_key(task) not in skip_keys:
+                yield task
+
+
+def run_tasks(next_task, total, store, workers, on_result=None, on_error=None, task_timeout=TASK_TIMEOUT):
+    """
+    Выполняет задания в пуле процессов, держа в очереди не больше
+    workers * IN_FLIGHT_PER_WORKER futures: память родителя не зависит от числа заданий.
+    next_task() возвращает следующее задание или None, если сейчас выдавать нечего;
+    работа заканчивается, когда заданий нет и очередь пуста.
+    on_result(rec) вызывается для каждого полученного результата,
+    on_error(task) - для задания, завершившегося исключением.
+    """
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(task_timeout,)) as exe, \
+            tqdm(total=total, ncols=80, desc="Parameter study") as progress:
+        pending = {}
+        while True:
+            while len(pending) < max_in_flight:
+                task = next_task()
+                if task is None:
+                    break
+                pending[exe.submit(run_one, task)] = task
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                task = pending.pop(fut)
+                progress.update(1)
+                try:
+                    rec = fut.result()
+                except Exception as e:
+                    print(f"ERROR in task {task}: {e}")
+                    if on_error is not None:
+                        on_error(task)
+                    continue
+                store.append(rec)
+                if on_result is not None:
+                    on_result(rec)
+
+
+def run_adaptive(store, workers, budget=None, history=(), task_timeout=TASK_TIMEOUT):
+    """
+    Адаптивный режим: повторы выдаёт AdaptiveScheduler, пока доверительные интервалы
+    средних не станут достаточно узкими или не будет исчерпан бюджет запусков.
+    history - уже имеющиеся записи (продолжение исследования).
+    По умолчанию бюджет равен размеру фиксированного плана (N_REPEATS на конфигурацию).
+    """
+    configs = list(itertools.product(MODES_RANGE, FORCE_RANGE, MOMENT_RANGE))
+    if budget is None:
+        budget = len(configs) * N_REPEATS
+    scheduler = AdaptiveScheduler(configs, budget=budget)
+    for rec in history:
+        scheduler.record(rec)
+    run_tasks(scheduler.next_task, scheduler.budget, store, workers, on_result=scheduler.record,
+              on_error=scheduler.task_failed, task_timeout=task_timeout)
+    return scheduler.summary()
+
+
+# ---------------------- Распределённый режим --------------------------------
+def coordinate(queue_path, tasks, store, total, poll_interval=QUEUE_POLL_INTERVAL, reset=False,
+               listen=None, authkey=None):
+    """
+    Координатор: публикует задания в очередь и переносит готовые результаты
+    в хранилище, пока в очереди есть невыполненные задания.
+    reset=True (--force) - уже выполненные задания в очереди считаются заново.
+    listen=(host, port) - на время расчёта поднять сервер очереди для работников
+    других машин (ключ доступа authkey).
+    """
+    with WorkQueue(queue_path) as queue, \
+            tqdm(total=total, ncols=80, desc="Parameter study (queue)") as progress:
+        n_new = queue.publish(tasks, reset=reset)
+        print(f"Поставлено в очередь заданий: {n_new}")
+        with QueueServer(queue_path, listen, authkey) if listen else contextlib.nullcontext():
+            if listen:
+                print(f"Сервер очереди слушает {listen[0]}:{listen[1]}")
+            while True:
+                reclaimed = queue.reclaim_expired()
+                if reclaimed:
+                    print(f"Возвращено в очередь заданий от неотвечающих работников: {reclaimed}")
+                for rec in queue.collect_results():
+                    store.append(rec)
+                    progress.update(1)
+                store.flush()
+                counts = queue.counts()
+                if counts['pending'] == 0 and counts['running'] == 0:
+                    for rec in queue.collect_results():
+                        store.append(rec)
+                        progress.update(1)
+                    break
+                time.sleep(poll_interval)
+    return counts
+
+
+def _heartbeat_loop(queue_source, worker_id, task, stop):
+    # Отдельное соединение: соединения sqlite3 не разделяются между потоками
+    try:
+        with open_work_queue(queue_source) as queue:
+            while not stop.wait(HEARTBEAT_INTERVAL):
+                if not queue.heartbeat(worker_id, task):
+                    break
+    except (EOFError, OSError):
+        pass  # сервер очереди недоступен - аренду продлить нельзя, задание вернётся в очередь
+
+
+def _wait_for_queue(queue_source, poll_interval):
+    """Подключение к очереди; сервер очереди, ещё не запущенный координатором, ждём."""
+    while True:
+        try:
+            return open_work_queue(queue_source)
+        except ConnectionRefusedError:
+            time.sleep(poll_interval)
+
+
+def worker_loop(queue_source, worker_id=None, poll_interval=QUEUE_POLL_INTERVAL, task_timeout=TASK_TIMEOUT):
+    """
+    Работник: захватывает задания из очереди, пока они есть, и возвращает результаты.
+    queue_source - файл очереди (эта машина) или (address, authkey) сервера очереди.
+    Пока задание считается, фоновый поток продлевает его аренду heartbeat'ом.
+    Работник, запущенный раньше координатора, ждёт сервер и первые задания;
+    завершается, когда после начала работы в очереди не осталось ни свободных,
+    ни выполняющихся заданий, или когда координатор остановил сервер очереди.
+    """
+    worker_id = worker_id or default_worker_id()
+    _init_worker(task_timeout)
+    n_done = 0
+    seen_work = False
+    try:
+        with _wait_for_queue(queue_source, poll_interval) as queue:
+            while True:
+                task = queue.claim(worker_id)
+                if task is None:
+                    counts = queue.counts()
+                    if seen_work and counts['pending'] == 0 and counts['running'] == 0:
+                        break
+                    # Задания ещё не опубликованы или чужие задания могут вернуться в очередь
+                    seen_work = seen_work or counts['running'] > 0
+                    time.sleep(poll_interval)
+                    continue
+                seen_work = True
+
+                stop = threading.Event()
+                beat = threading.Thread(target=_heartbeat_loop, args=(queue_source, worker_id, task, stop),
+                                        daemon=True)
+                beat.start()
+                try:
+                    rec = run_one(task)
+                    queue.complete(worker_id, task, rec)
+                    n_done += 1
+                except (EOFError, ConnectionError):
+                    raise
+                except Exception as e:
+                    print(f"ERROR in task {task}: {e}")
+                    queue.fail(worker_id, task, e)
+                finally:
+                    stop.set()
+                    beat.join()
+    except (EOFError, ConnectionError):
+        print(f"Работник {worker_id}: сервер очереди закрыт")
+    return n_done
+
+
+def run_workers(queue_source, n_processes, task_timeout=TASK_TIMEOUT):
+    """
+    Запуск n_processes работников на этой машине (каждый - отдельный процесс).
+    """
+    procs = [multiprocessing.Process(target=worker_loop, args=(queue_source,),
+                                     kwargs={'task_timeout': task_timeout})
+             for _ in range(n_processes)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter study обратной задачи")
+    parser.add_argument('--force', action='store_true',
+                        help='Пересчитать все задания, даже уже имеющиеся в хранилище')
+    parser.add_argument('--retry-timed-out', action='store_true',
+                        help='Пересчитать задания, прерванные по пределу времени (по умолчанию '
+                             'они считаются выполненными)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Адаптивное число повторов вместо фиксированных N_REPEATS')
+    parser.add_argument('--budget', type=int, default=None,
+                        help='Адаптивный режим: максимум запусков оптимизатора за сессию')
+    parser.add_argument('--role', choices=('local', 'coordinator', 'worker'), default='local',
+                        help='local - пул процессов на этой машине; coordinator/worker - '
+                             'координатор и работники с общей очередью: на машине координатора '
+                             'через файл --queue, на других машинах через --listen/--connect')
+    parser.add_argument('--queue', default=QUEUE_PATH,
+                        help='Файл очереди SQLite на локальном диске координатора (режим WAL '
+                             'не работает на сетевых файловых системах)')
+    parser.add_argument('--listen', default=None, metavar='HOST:PORT',
+                        help='Координатор: сервер очереди для работников других машин '
+                             '(например, 0.0.0.0:50000)')
+    parser.add_argument('--connect', default=None, metavar='HOST:PORT',
+                        help='Работник: адрес сервера очереди координатора (без него - файл --queue)')
+    parser.add_argument('--authkey', default=os.environ.get(QUEUE_AUTHKEY_ENV),
+                        help=f'Ключ доступа к серверу очереди (по умолчанию - из ${QUEUE_AUTHKEY_ENV})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Число процессов-работников на этой машине (по умолчанию - число ядер)')
+    parser.add_argument('--order', choices=('lpt', 'grid'), default='lpt',
+                        help='Порядок выдачи заданий: lpt - сначала самые долгие, grid - порядок сетки')
+    parser.add_argument('--timeout', type=float, default=TASK_TIMEOUT,
+                        help='Предел времени одной оптимизации, с (0 - без ограничения)')
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 4
+    task_timeout = args.timeout or None
+    if (args.listen or args.connect) and not args.authkey:
+        parser.error(f"для --listen/--connect нужен --authkey или ${QUEUE_AUTHKEY_ENV}")
+    authkey = args.authkey.encode() if args.authkey else None
+    if args.role == 'worker':
+        queue_source = (parse_address(args.connect), authkey) if args.connect else args.queue
+        run_workers(queue_source, workers, task_timeout)
+        return
+
+    os.makedirs("data", exist_ok=True)
+    if not os.path.exists(STORE_PATH) and os.path.exists(JSON_PATH):
+        n_imported = import_json(JSON_PATH, STORE_PATH)
+        print(f"Импортировано {n_imported} записей из {JSON_PATH} в {STORE_PATH}")
+
+    if args.adaptive:
+        history = () if args.force else read_records(STORE_PATH)
+        with ResultStore(STORE_PATH, batch_size=STORE_BATCH) as store:
+            summary = run_adaptive(store, workers, budget=args.budget, history=history,
+                                   task_timeout=task_timeout)
+        print(f"\nАдаптивный режим: сошлось {summary['converged']} из {summary['configs']} конфигураций, "
+              f"запусков в этой сессии: {summary['runs_this_session']}")
+        if summary['excluded_records']:
+            print(f"Не вошли в статистику (прерваны по времени или без результата): "
+                  f"{summary['excluded_records']}")
+        n_before, n_after = compact(STORE_PATH)
+        print(f"Результаты в {STORE_PATH} (записей: {n_after})")
+        return
+
+    # Продолжение прерванного исследования: уже посчитанные задания пропускаются
+    # (прерванные по пределу времени - тоже, если не задан --retry-timed-out)
+    done = frozenset() if args.force else completed_keys(
+        STORE_PATH, include_timed_out=not args.retry_timed_out)
+    n_all = len(MODES_RANGE) * len(FORCE_RANGE) * len(MOMENT_RANGE) * N_REPEATS
+    total = sum(1 for _ in iter_tasks(done))
+    print(f"Уже выполнено {n_all - total} из {n_all} заданий, осталось {total}")
+
+    # Одна модель стоимости и для порядка заданий, и для оценки времени
+    cost_model = load_cost_model(COST_MODEL_PATH, history=read_records(STORE_PATH))
+    configs = config_order(args.order, cost_model)
+    tasks = ordered_tasks(configs, done)
+    if total and cost_model.n_records:
+        # Оставшиеся повторы по конфигурациям: конфигураций немного, заданий - много
+        remaining = collections.Counter(task[:3] for task in iter_tasks(done))
+        n_modes, n_f, n_m = np.array(list(remaining)).T
+        cpu_s = (cost_model.predict_time(n_f, n_m, n_modes)
+                 * np.array(list(remaining.values()))).sum()
+        print(f"Оценка по модели стоимости ({cost_model.n_records} записей): "
+              f"{cpu_s / 3600:.1f} ч CPU, ~{cpu_s / workers / 3600:.1f} ч на {workers} работниках")
+    # Для отчёта о makespan родитель хранит только time_s по ключу записи
+    durations = {}
+    n_timed_out = 0
+
+    def on_result(rec):
+        nonlocal n_timed_out
+        durations[(rec['N_modes'], rec['N_F'], rec['N_M'], rec['repeat'])] = rec['time_s']
+        n_timed_out += bool(rec['timed_out'])
+
+    with ResultStore(STORE_PATH, batch_size=STORE_BATCH) as store:
+        if args.role == 'coordinator':
+            counts = coordinate(args.queue, tasks, store, total, reset=args.force,
+                                listen=parse_address(args.listen) if args.listen else None,
+                                authkey=authkey)
+            if counts['failed']:
+                print(f"Заданий с ошибкой: {counts['failed']} (см. таблицу tasks в {args.queue})")
+        else:
+            pending_tasks = iter(tasks)
+            t0 = time.time()
+            run_tasks(lambda: next(pending_tasks, None), total, store, workers,
+                      on_result=on_result, task_timeout=task_timeout)
+            wall = time.time() - t0
+
+    if durations:
+        # Порядок выдачи восстанавливается тем же ленивым перебором
+        report = makespan_report(durations, workers, map(task_store_key, ordered_tasks(configs, done)))
+        print(f"\nMakespan: фактически {wall:.1f} с; по time_s заданий на {workers} работниках: "
+              f"порядок {args.order} {report['run_order']:.1f} с, порядок сетки {report['grid_order']:.1f} с, "
+              f"нижняя граница {report['lower_bound']:.1f} с")
+        if n_timed_out:
+            print(f"Прервано по пределу времени ({args.timeout:g} с): {n_timed_out} заданий")
+
+    n_before, n_after = compact(STORE_PATH)
+    print(f"\nГотово! Результаты в {STORE_PATH} (записей: {n_after}, удалено дубликатов/повреждённых: {n_before - n_after})")
+
+
 if __name__ == "__main__":
-    # 4) Собираем все задания
-    tasks = [
-        (nm, nf, nmom, rep)
-        for nm in MODES_RANGE
-        for nf in FORCE_RANGE
-        for nmom in MOMENT_RANGE
-        for rep in range(N_REPEATS)
-    ]
-
-    total = len(tasks)
-    workers = os.cpu_count() or 4
-
-    # 5) Запуск в пуле процессов
-    with ProcessPoolExecutor(max_workers=workers) as exe:
-        futures = {exe.submit(run_one, t): t for t in tasks}
-
-        # tqdm для визуализации прогресса и ETA
-        for fut in tqdm(as_completed(futures),
-                        total=total,
-                        ncols=80,
-                        desc="Parameter study"):
-            task = futures[fut]
-            try:
-                rec = fut.result()
-            except Exception as e:
-                print(f"ERROR in task {task}: {e}")
-                continue
-
-            results.append(rec)
-            # сохраняем сразу, чтобы не потерять данные при краше
-            with open(JSON_PATH, "w", encoding="utf-8") as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
-
-    print(f"\nГотово! Результаты в {JSON_PATH}")
+    main()
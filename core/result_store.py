@@ -0,0 +1,226 @@
+import json
+import os
+
+import numpy as np
+
+# Поля, однозначно задающие задание parameter study
+TASK_KEY_FIELDS = ('N_modes', 'N_F', 'N_M', 'repeat')
+
+
+def task_key(record):
+    return tuple(record[field] for field in TASK_KEY_FIELDS)
+
+
+def is_timed_out(record):
+    """Запуск прерван по пределу времени: error не сошёлся, time_s обрезан пределом."""
+    return record.get('timed_out') in (True, 'True', 'true')
+
+
+def _ends_with_newline(path):
+    """Пустой файл или последний байт - перевод строки."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+class ResultStore:
+    """
+    Хранилище результатов только на дозапись (JSON Lines: одна запись - одна строка).
+    Записи копятся в буфере и сбрасываются пачками по batch_size с flush + fsync,
+    поэтому стоимость записи не зависит от объёма уже накопленных результатов,
+    а при падении теряется не больше одной неполной пачки. Если прошлый запуск
+    упал посреди записи и файл кончается неполной строкой, новые записи
+    начинаются с новой строки, а не дописываются к повреждённой.
+    """
+
+    def __init__(self, path, batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        if not _ends_with_newline(path):
+            self._file.write('\n')
+
+    def append(self, record):
+        self._buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        self._file.write('\n'.join(self._buffer) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer = []
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_records(path):
+    """
+    Построчное чтение хранилища. Повреждённые строки (например, недописанная
+    последняя строка после падения) пропускаются.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_new_records(path, offset=0):
+    """
+    Дочитать записи, дописанные в хранилище после позиции offset (в байтах).
+    Недописанная последняя строка не читается. Возвращает (записи, новая позиция,
+    restarted); restarted=True - файл был перезаписан (compact) и стал короче offset,
+    поэтому прочитан с начала и ранее прочитанное нужно отбросить.
+    """
+    if not os.path.exists(path):
+        return [], offset, False
+    restarted = os.path.getsize(path) < offset
+    if restarted:
+        offset = 0
+    records = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records, offset, restarted
+
+
+def completed_keys(path, key=task_key, include_timed_out=True):
+    """
+    Множество ключей заданий, уже имеющих запись в хранилище.
+    include_timed_out=False - задания, последняя запись которых прервана по
+    пределу времени, не считаются выполненными (их можно пересчитать).
+    """
+    keys = set()
+    for record in read_records(path):
+        try:
+            k = key(record)
+        except KeyError:
+            continue
+        if include_timed_out or not is_timed_out(record):
+            keys.add(k)
+        else:
+            keys.discard(k)
+    return keys
+
+
+def load_dataframe(path, columns=None):
+    import pandas as pd
+
+    df = pd.DataFrame(list(read_records(path)))
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+# ---------------------- Колоночные форматы для анализа ----------------------
+COLUMNAR_EXTENSIONS = ('.parquet', '.npz')
+
+
+def save_columnar(df, path):
+    """
+    Сохранить таблицу результатов в колоночном формате для быстрого чтения:
+      .parquet - все колонки (нужен pyarrow);
+      .npz     - только числовые и логические колонки, без сжатия,
+                 каждая колонка - отдельный массив, читается независимо от остальных.
+    """
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    elif path.endswith('.npz'):
+        numeric = df.select_dtypes(include=['number', 'bool'])
+        np.savez(path, **{c: numeric[c].to_numpy() for c in numeric.columns})
+    else:
+        raise ValueError(f"Неизвестный колоночный формат '{path}', допустимо: {COLUMNAR_EXTENSIONS}")
+
+
+def load_columnar(path, columns=None):
+    """
+    Чтение только нужных колонок (columns=None - все). Parquet читается через
+    отображение файла в память (memory_map), из .npz распаковываются только
+    запрошенные массивы. Отсутствующие в файле колонки пропускаются.
+    """
+    import pandas as pd
+
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        names = pq.read_schema(path, memory_map=True).names
+        if columns is not None:
+            names = [c for c in columns if c in names]
+        return pq.read_table(path, columns=names, memory_map=True).to_pandas()
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            names = data.files if columns is None else [c for c in columns if c in data.files]
+            return pd.DataFrame({c: data[c] for c in names})
+    raise ValueError(f"Неизвестный колоночный формат '{path}', допустимо: {COLUMNAR_EXTENSIONS}")
+
+
+def _atomic_write_lines(path, records):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def compact(path, key=task_key):
+    """
+    Уплотнение хранилища: удаляет повреждённые строки и дубликаты заданий
+    (остаётся последняя запись по ключу), перезаписывая файл атомарно
+    через временный файл и os.replace. Возвращает (было, стало) записей.
+    Вызывать, когда в файл никто не пишет.
+    """
+    latest = {}
+    n_before = 0
+    for record in read_records(path):
+        n_before += 1
+        try:
+            latest[key(record)] = record
+        except KeyError:
+            continue
+    _atomic_write_lines(path, latest.values())
+    return n_before, len(latest)
+
+
+def import_json(json_path, path):
+    """
+    Однократный перенос результатов из старого формата (один JSON-массив) в хранилище.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    _atomic_write_lines(path, records)
+    return len(records)
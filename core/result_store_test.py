@@ -0,0 +1,33 @@
+import json
+
+from core.result_store import ResultStore, compact, completed_keys, read_records
+
+
+def _record(repeat):
+    return {'N_modes': 1, 'N_F': 2, 'N_M': 3, 'repeat': repeat, 'error': 0.1, 'time_s': 1.0}
+
+
+def test_append_after_partial_line(tmp_path):
+    path = str(tmp_path / 'study.jsonl')
+    # Прошлый запуск упал посреди записи: последняя строка оборвана
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(_record(1)) + '\n' + json.dumps(_record(2))[:20])
+    with ResultStore(path, batch_size=10) as store:
+        store.append(_record(3))
+        store.append(_record(4))
+
+    assert [rec['repeat'] for rec in read_records(path)] == [1, 3, 4]
+    assert compact(path)[1] == 3
+    assert [rec['repeat'] for rec in read_records(path)] == [1, 3, 4]
+
+
+def test_completed_keys_retry_timed_out(tmp_path):
+    path = str(tmp_path / 'study.jsonl')
+    with ResultStore(path) as store:
+        store.append(_record(1))
+        store.append(dict(_record(2), timed_out=True))
+        store.append(dict(_record(3), timed_out=True))
+        store.append(dict(_record(3), timed_out=False))  # повтор после прерывания
+
+    assert {k[3] for k in completed_keys(path)} == {1, 2, 3}
+    assert {k[3] for k in completed_keys(path, include_timed_out=False)} == {1, 3}
@@ -1,5 +1,34 @@
+from functools import lru_cache
+
 import numpy as np
 from scipy.interpolate import UnivariateSpline
+from scipy.linalg import cho_solve_banded, cholesky_banded, solveh_banded
+from scipy.special import comb
+
+# Во сколько раз мелкая сетка для интегрирования q(z) гуще исходной
+FINE_GRID_FACTOR = 10
+
+# Штрафной (Тихоновский) сглаживатель: порядок разностей в штрафе и сетка λ для GCV.
+# Порядок 3 соответствует квинтическому сглаживающему сплайну (k=5).
+PENALTY_ORDER = 3
+PENALTY_LAMBDAS = np.logspace(-6, 8, 57)
+
+DERIVATIVE_METHODS = ('spline', 'penalized')
+
+# Локализация нагрузок: 'segments' - интегрирование q по отрезкам фиксированной длины,
+# 'jumps' - поиск скачков поперечной силы Q и момента M за один проход по сетке
+LOCALISATION_MODES = ('segments', 'jumps')
+# Порог обнаружения скачка в единицах робастного разброса ΔQ (MAD), но не ниже
+# доли JUMP_FLOOR от максимального |ΔQ|; JUMP_EDGE узлов у опор не рассматриваются
+# (там разностные производные недостоверны)
+JUMP_NSIGMA = 5.0
+JUMP_FLOOR = 1e-3
+JUMP_EDGE = 3
+# Максимальный зазор (в узлах) между половинами двухполярного всплеска от момента
+JUMP_MAX_GAP = 2
+# Допуск на взаимную компенсацию площадей половин всплеска от момента
+JUMP_PAIR_RTOL = 0.5
+
 
 def generate_random_displacements(n, L, N_modes=5, max_amplitude=1.0):
     z = np.linspace(0, L, n + 2)
@@ -10,47 +39,323 @@ def generate_random_displacements(n, L, N_modes=5, max_amplitude=1.0):
     return z, w
 
 
-def compute_forces_and_moments(displacement_tuple, EI=1.0, smoothing_factor=0.01, segment_length=2.0,
-                               force_threshold=10, moment_threshold=50):
-    z, w = displacement_tuple
+def _segment_bounds(fine_z, z_last, segment_length):
+    """
+    Индексы точек мелкой сетки для каждого сегмента [i*segment_length, min((i+1)*segment_length, z_last)]:
+    точки сегмента i - это fine_z[starts[i]:stops[i]] (обе границы включены, как в маске >= / <=).
+    """
+    n_segments = int(np.ceil((z_last - fine_z[0]) / segment_length))
+    z_start = np.arange(n_segments) * segment_length
+    z_end = np.minimum(z_start + segment_length, z_last)
+    starts = np.searchsorted(fine_z, z_start, side='left')
+    stops = np.searchsorted(fine_z, z_end, side='right')
+    return z_start, z_end, starts, stops
+
+
+def _segment_reduce(ufunc, values, starts, stops):
+    """
+    ufunc.reduceat по последней оси для полуинтервалов [starts[i], stops[i]).
+    Границы чередуются (start, stop, start, stop, ...) и берутся только чётные результаты,
+    поэтому сегменты могут перекрываться по граничной точке. Пустые сегменты
+    (stops <= starts) дают мусор и должны отфильтровываться вызывающим кодом.
+    """
+    pad = np.zeros(values.shape[:-1] + (1,), dtype=values.dtype)
+    padded = np.concatenate((values, pad), axis=-1)
+    indices = np.column_stack((starts, stops)).ravel()
+    return ufunc.reduceat(padded, indices, axis=-1)[..., ::2]
+
+
+def _extract_loads(fine_z, fine_q, fine_M, z_last, segment_length, force_threshold, moment_threshold):
+    """
+    Выделение сосредоточенных сил и моментов по сегментам для одной или пачки кривых.
+    fine_q, fine_M - массивы (n_fine,) или (B, n_fine) на общей мелкой сетке fine_z.
+    Возвращает списки forces, moments (для пачки - списки списков).
+    """
+    fine_q = np.atleast_2d(fine_q)
+    fine_M = np.atleast_2d(fine_M)
+    z_start, z_end, starts, stops = _segment_bounds(fine_z, z_last, segment_length)
+    has_interval = stops - starts > 1
+
+    # Трапеции между соседними точками мелкой сетки; интеграл по сегменту -
+    # сумма трапеций с номерами [start, stop - 1)
+    dz = np.diff(fine_z)
+    q_trap = (fine_q[:, :-1] + fine_q[:, 1:]) / 2.0 * dz
+    zq = fine_z * fine_q
+    zq_trap = (zq[:, :-1] + zq[:, 1:]) / 2.0 * dz
+
+    interval_stops = np.maximum(stops - 1, starts)
+    F = _segment_reduce(np.add, q_trap, starts, interval_stops)
+    zF = _segment_reduce(np.add, zq_trap, starts, interval_stops)
+
+    delta_M = (_segment_reduce(np.maximum, fine_M, starts, stops)
+               - _segment_reduce(np.minimum, fine_M, starts, stops))
+    z_M = (z_start + z_end) / 2
+
+    force_hits = has_interval & (np.abs(F) > force_threshold)
+    moment_hits = has_interval & (np.abs(delta_M) > moment_threshold)
+
+    all_forces = []
+    all_moments = []
+    for b in range(fine_q.shape[0]):
+        seg_f = np.flatnonzero(force_hits[b])
+        seg_m = np.flatnonzero(moment_hits[b])
+        all_forces.append([(zF[b, i] / F[b, i], F[b, i]) for i in seg_f])
+        all_moments.append([(z_M[i], delta_M[b, i]) for i in seg_m])
+    return all_forces, all_moments
+
+
+def _fit_derivatives(z, w, EI, smoothing_factor, fine_z):
     spline = UnivariateSpline(z, w, s=smoothing_factor, k=5)
 
-    w_pp = spline.derivative(n=2)
-    w_ppp = spline.derivative(n=3)
-    w_pppp = spline.derivative(n=4)
+    # Производные считаются вызовом spline(x, nu) без построения сплайнов-производных;
+    # исходная и мелкая сетки вычисляются за один проход
+    n = len(z)
+    both_z = np.concatenate((z, fine_z))
+    w_pp = spline(both_z, nu=2)
+    w_pppp = spline(both_z, nu=4)
+
+    M = -EI * w_pp[:n]
+    Q = -EI * spline(z, nu=3)
+    q = EI * w_pppp[:n]
+    fine_q = EI * w_pppp[n:]
+    fine_M = -EI * w_pp[n:]
+    return Q, M, q, fine_q, fine_M
 
-    M = -EI * w_pp(z)
-    Q = -EI * w_ppp(z)
-    q = EI * w_pppp(z)
-    fine_z = np.linspace(z[0], z[-1], 10 * len(z))
-    fine_q = EI * w_pppp(fine_z)
-    fine_M = -EI * w_pp(fine_z)
+
+@lru_cache(maxsize=16)
+def _difference_penalty(n, order):
+    """
+    Штрафная матрица P = D^T D (D - разности порядка order) в верхней ленточной форме
+    для solveh_banded ((order + 1) x n чисел). Кэшируется по (n, order).
+    """
+    c = comb(order, np.arange(order + 1)) * (-1.0) ** (order - np.arange(order + 1))
+    n_rows = n - order
+    band = np.zeros((order + 1, n))
+    for k in range(order + 1):
+        diag_k = np.zeros(n - k)
+        for j in range(order + 1 - k):
+            diag_k[j:j + n_rows] += c[j] * c[j + k]
+        band[order - k, k:] = diag_k
+    return band
+
+
+def _banded_inverse_trace(chol):
+    """
+    След обратной матрицы A^{-1} по ленточному множителю Холецкого A = U^T U
+    (верхняя ленточная форма cholesky_banded), сразу для пачки множителей
+    chol (K, b + 1, n). Рекурсия Такахаши (selected inversion): из U Σ = U^{-T}
+    элементы Σ = A^{-1} внутри ленты считаются снизу вверх,
+        Σ_ij = (δ_ij / U_ii - Σ_{k=i+1..i+b} U_ik Σ_kj) / U_ii,  i <= j <= i + b,
+    и нужны только уже найденные элементы той же ленты: O(n b^2) на матрицу
+    вместо O(n^3) у полного разложения.
+    """
+    K, b1, n = chol.shape
+    b = b1 - 1
+    # sigma[:, d, i] = Σ_{i, i+d}
+    sigma = np.zeros((K, b1, n))
+    for i in range(n - 1, -1, -1):
+        m_max = min(b, n - 1 - i)
+        u_ii = chol[:, b, i]
+        # U_{i, i+m} = chol[:, b - m, i + m]
+        u_row = [chol[:, b - m, i + m] for m in range(1, m_max + 1)]
+        for d in range(m_max, 0, -1):
+            acc = 0.0
+            for m in range(1, m_max + 1):
+                # Σ_{i+m, i+d} - по симметрии из строки min(i+m, i+d)
+                acc = acc + u_row[m - 1] * sigma[:, abs(d - m), i + min(m, d)]
+            sigma[:, d, i] = -acc / u_ii
+        acc = 0.0
+        for m in range(1, m_max + 1):
+            acc = acc + u_row[m - 1] * sigma[:, m, i]
+        sigma[:, 0, i] = (1.0 / u_ii - acc) / u_ii
+    return sigma[:, 0, :].sum(axis=1)
+
+
+def select_smoothing_gcv(W, order=PENALTY_ORDER, lambdas=PENALTY_LAMBDAS):
+    """
+    Выбор λ для каждой кривой (строки W) по обобщённой кросс-валидации
+    GCV(λ) = n·RSS(λ) / (n - tr H(λ))^2, H(λ) = (I + λP)^{-1}.
+    На каждое λ - одно ленточное разложение Холецкого I + λP: по нему решаются
+    системы для всей пачки кривых (RSS) и считается tr H (_banded_inverse_trace).
+    Время и память O(n) на одно λ.
+    """
+    W = np.atleast_2d(W)
+    n = W.shape[1]
+    band = _difference_penalty(n, order)
+    chol = np.empty((len(lambdas),) + band.shape)
+    rss = np.empty((W.shape[0], len(lambdas)))
+    for j, lam in enumerate(lambdas):
+        ab = lam * band
+        ab[-1] += 1.0
+        chol[j] = cholesky_banded(ab, lower=False)
+        U = cho_solve_banded((chol[j], False), W.T)                # (n, B)
+        rss[:, j] = ((W.T - U) ** 2).sum(axis=0)
+    trace_h = _banded_inverse_trace(chol)                           # (n_lam,)
+    gcv = n * rss / (n - trace_h) ** 2
+    return lambdas[np.argmin(gcv, axis=1)]
+
+
+def penalized_smooth(w, lam, order=PENALTY_ORDER):
+    """
+    Сглаживание Уиттекера: u = argmin ||w - u||^2 + λ ||D u||^2,
+    решение ленточной системы (I + λ D^T D) u = w за O(n).
+    """
+    band = _difference_penalty(len(w), order)
+    ab = lam * band
+    ab[-1] += 1.0
+    return solveh_banded(ab, w)
+
+
+def _fit_derivatives_penalized(z, W, EI, fine_z, order=PENALTY_ORDER):
+    """
+    Аналог _fit_derivatives на штрафном сглаживателе для пачки кривых W (B, n)
+    на равномерной сетке z. λ выбирается по GCV для каждой кривой отдельно,
+    производные - центральными разностями от сглаженной кривой.
+    """
+    W = np.atleast_2d(W)
+    lams = select_smoothing_gcv(W, order)
+    U = np.array([penalized_smooth(w, lam, order) for w, lam in zip(W, lams)])
+
+    w_p = np.gradient(U, z, axis=1)
+    w_pp = np.gradient(w_p, z, axis=1)
+    w_ppp = np.gradient(w_pp, z, axis=1)
+    w_pppp = np.gradient(w_ppp, z, axis=1)
+
+    M = -EI * w_pp
+    Q = -EI * w_ppp
+    q = EI * w_pppp
+    fine_q = np.array([np.interp(fine_z, z, row) for row in q])
+    fine_M = np.array([np.interp(fine_z, z, row) for row in M])
+    return Q, M, q, fine_q, fine_M, lams
+
+
+def detect_jumps(z, Q, force_threshold=10, moment_threshold=50, n_sigma=JUMP_NSIGMA):
+    """
+    Локализация сосредоточенных нагрузок по скачкам восстановленных Q(z) и M(z).
+
+    Сила F в точке a даёт ступеньку Q (излом M), сглаженная ступенька - одно-
+    полярный всплеск приращений ΔQ; момент даёт скачок M, то есть узкий пик Q,
+    который в ΔQ выглядит как пара всплесков противоположного знака.
+    Один линейный проход по ΔQ выделяет участки одного знака, где |ΔQ| превышает
+    n_sigma робастных отклонений (1.4826·MAD) фона:
+    - одиночный участок -> сила F = -ΣΔQ (в той же конвенции, что и ∫q dz в режиме
+      'segments'), положение - центр тяжести |ΔQ| по серединам интервалов;
+    - соседняя пара противоположных участков с почти нулевой суммой -> момент,
+      величина - скачок M = ∫(Q - Q_фон) dz, положение - центр тяжести |Q - Q_фон|.
+    Положения получаются с точностью лучше шага сетки.
+    """
+    dQ = np.diff(Q)
+    z_mid = (z[:-1] + z[1:]) / 2
+    peak = np.max(np.abs(dQ), initial=0.0)
+    if peak == 0.0:
+        return [], []
+    sigma = 1.4826 * np.median(np.abs(dQ - np.median(dQ)))
+    level = max(n_sigma * sigma, JUMP_FLOOR * peak)
+
+    # Метки участков: знак ΔQ там, где превышен порог, 0 - иначе; границы участков -
+    # смены метки
+    label = np.where(np.abs(dQ) > level, np.sign(dQ), 0.0)
+    label[:JUMP_EDGE] = 0.0
+    label[len(label) - JUMP_EDGE:] = 0.0
+    edges = np.flatnonzero(np.diff(label)) + 1
+    bounds = np.concatenate(([0], edges, [len(label)]))
+    runs = [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if label[lo] != 0]
 
     forces = []
     moments = []
-    n_segments = int(np.ceil((z[-1] - z[0]) / segment_length))
+    i = 0
+    while i < len(runs):
+        lo, hi = runs[i]
+        area = dQ[lo:hi].sum()
+        if i + 1 < len(runs):
+            lo2, hi2 = runs[i + 1]
+            area2 = dQ[lo2:hi2].sum()
+            is_pair = (lo2 - hi <= JUMP_MAX_GAP and np.sign(area) != np.sign(area2)
+                       and abs(area + area2) <= JUMP_PAIR_RTOL * max(abs(area), abs(area2)))
+            if is_pair:
+                # Q[lo] и Q[hi2] - значения по краям пика; фон между ними линейный
+                span = slice(lo, hi2 + 1)
+                z_span = z[span]
+                Q_base = np.interp(z_span, [z[lo], z[hi2]], [Q[lo], Q[hi2]])
+                excess = Q[span] - Q_base
+                delta_M = np.trapezoid(excess, z_span)
+                if abs(delta_M) > moment_threshold:
+                    weights = np.abs(excess)
+                    moments.append((np.sum(z_span * weights) / np.sum(weights), delta_M))
+                i += 2
+                continue
+        F = -area
+        if abs(F) > force_threshold:
+            weights = np.abs(dQ[lo:hi])
+            forces.append((np.sum(z_mid[lo:hi] * weights) / np.sum(weights), F))
+        i += 1
+    return forces, moments
+
+
+def compute_forces_and_moments(displacement_tuple, EI=1.0, smoothing_factor=0.01, segment_length=2.0,
+                               force_threshold=10, moment_threshold=50, method='spline', mode='segments'):
+    """
+    method='spline'    - квинтический UnivariateSpline со сглаживанием smoothing_factor;
+    method='penalized' - штрафной сглаживатель с автоматическим выбором λ (GCV),
+                         smoothing_factor не используется, сетка z должна быть равномерной.
+    mode='segments'    - силы и моменты по отрезкам длины segment_length;
+    mode='jumps'       - поиск скачков Q и M (detect_jumps), segment_length не используется.
+    """
+    if method not in DERIVATIVE_METHODS:
+        raise ValueError(f"Неизвестный метод '{method}', допустимо: {DERIVATIVE_METHODS}")
+    if mode not in LOCALISATION_MODES:
+        raise ValueError(f"Неизвестный режим '{mode}', допустимо: {LOCALISATION_MODES}")
+    z, w = displacement_tuple
+    fine_z = np.linspace(z[0], z[-1], FINE_GRID_FACTOR * len(z))
+    if method == 'penalized':
+        Q, M, q, fine_q, fine_M, _ = _fit_derivatives_penalized(z, w, EI, fine_z)
+        Q, M, q = Q[0], M[0], q[0]
+    else:
+        Q, M, q, fine_q, fine_M = _fit_derivatives(z, w, EI, smoothing_factor, fine_z)
 
-    for i in range(n_segments):
-        z_start = i * segment_length
-        z_end = min((i + 1) * segment_length, z[-1])
+    if mode == 'jumps':
+        forces, moments = detect_jumps(z, Q, force_threshold, moment_threshold)
+        return z, Q, M, q, forces, moments
 
-        mask = (fine_z >= z_start) & (fine_z <= z_end)
-        segment_z = fine_z[mask]
-        segment_q = fine_q[mask]
+    forces, moments = _extract_loads(fine_z, fine_q, fine_M, z[-1], segment_length,
+                                     force_threshold, moment_threshold)
+    return z, Q, M, q, forces[0], moments[0]
 
-        if len(segment_z) > 1:
-            F = np.trapezoid(segment_q, segment_z)
-            if abs(F) > force_threshold:
-                z_F = np.trapezoid(segment_z * segment_q, segment_z) / F
-                forces.append((z_F, F))
 
-        segment_M = fine_M[mask]
-        if len(segment_M) > 1:
-            delta_M = np.max(segment_M) - np.min(segment_M)
-            if abs(delta_M) > moment_threshold:
-                z_M = (z_start + z_end) / 2
-                moments.append((z_M, delta_M))
+def compute_forces_and_moments_batch(z, W, EI=1.0, smoothing_factor=0.01, segment_length=2.0,
+                                     force_threshold=10, moment_threshold=50, method='spline',
+                                     mode='segments'):
+    """
+    Пакетный вариант compute_forces_and_moments для многих кривых w на общей сетке z.
+    W - массив (B, len(z)). Мелкая сетка и разбиение на сегменты строятся один раз,
+    интегрирование по сегментам выполняется сразу для всей пачки.
+    Возвращает (Q, M, q) формы (B, len(z)) и списки forces, moments длины B.
+    """
+    if method not in DERIVATIVE_METHODS:
+        raise ValueError(f"Неизвестный метод '{method}', допустимо: {DERIVATIVE_METHODS}")
+    if mode not in LOCALISATION_MODES:
+        raise ValueError(f"Неизвестный режим '{mode}', допустимо: {LOCALISATION_MODES}")
+    W = np.atleast_2d(W)
+    fine_z = np.linspace(z[0], z[-1], FINE_GRID_FACTOR * len(z))
 
-    return z, Q, M, q, forces, moments
+    if method == 'penalized':
+        Q, M, q, fine_q, fine_M, _ = _fit_derivatives_penalized(z, W, EI, fine_z)
+    else:
+        n_curves = W.shape[0]
+        Q = np.empty_like(W, dtype=float)
+        M = np.empty_like(W, dtype=float)
+        q = np.empty_like(W, dtype=float)
+        fine_q = np.empty((n_curves, len(fine_z)))
+        fine_M = np.empty((n_curves, len(fine_z)))
+        for b in range(n_curves):
+            Q[b], M[b], q[b], fine_q[b], fine_M[b] = _fit_derivatives(z, W[b], EI, smoothing_factor, fine_z)
 
+    if mode == 'jumps':
+        detected = [detect_jumps(z, Q_b, force_threshold, moment_threshold) for Q_b in Q]
+        forces = [f for f, _ in detected]
+        moments = [m for _, m in detected]
+        return Q, M, q, forces, moments
 
+    forces, moments = _extract_loads(fine_z, fine_q, fine_M, z[-1], segment_length,
+                                     force_threshold, moment_threshold)
+    return Q, M, q, forces, moments
@@ -21,49 +21,35 @@ def generate_random_displacements(n, L, N_modes=5, max_amplitude=1.0):
 # -------------------------------------------------------------
 # 2. Формулы для прогиба шарнирно-опёртой балки
 #    при сосредоточенной силе F или сосредоточенном моменте M
+#
+#    Знаки согласованы с BeamSolver.calculate_deflections_test:
+#    M(x) = R_A x + sum F_k <x - a_k> - sum M_j <x >= b_j>,  w'' = -M / (E I),
+#    w(0) = w(L) = 0. Формулы записаны через скобки Маколея, поэтому
+#    x, F, a (и M, b) могут быть массивами любых совместимых форм.
 # -------------------------------------------------------------
 def deflection_single_force(x, F, a, E, I, L):
     """
     Прогиб от сосредоточенной силы F, приложенной в точке a,
     для шарнирно-опертой балки на промежутке [0, L].
-    Формулы классические сопромата.
+    Поддерживает broadcasting по x, F и a; вне [0, L] прогиб равен нулю.
     """
-    # Удобно рассматривать отдельно области 0 <= x <= a и a <= x <= L.
-    # Для x < a и x >= a используем стандартные выражения.
-    # Ниже представлены обобщенные формулы (единичный пример).
-    # Реально в сопроме есть несколько разных форм, в зависимости от расположения x и a.
-    # Здесь — простой пример "собранный" из известных таблиц влияния.
-
-    if x < 0 or x > L:
-        return 0.0
-
-    if x <= a:
-        # Формула для 0 <= x <= a
-        return F * x * (L ** 2 - x ** 2 - 2 * a * L + a ** 2 + 2 * a * x) / (6 * E * I * L)
-    else:
-        # Формула для a <= x <= L
-        return F * a * (L - x) * (L ** 2 - (L - x) ** 2 - 2 * (L - a) * L + (L - a) ** 2 + 2 * (L - a) * (L - x)) / (
-                    6 * E * I * L * a)
-        # В учебниках эта часть обычно приводится в более компактном виде, но общая суть такова.
+    x = np.asarray(x, dtype=float)
+    b = L - a
+    macaulay = np.maximum(x - a, 0.0)
+    w = F * (b * x ** 3 - L * macaulay ** 3 - b * (L ** 2 - b ** 2) * x) / (6 * E * I * L)
+    return np.where((x < 0) | (x > L), 0.0, w)
 
 
 def deflection_single_moment(x, M, b, E, I, L):
     """
     Прогиб от сосредоточенного момента M, приложенного в точке b,
     для шарнирно-опертой балки на промежутке [0, L].
+    Поддерживает broadcasting по x, M и b; вне [0, L] прогиб равен нулю.
     """
-    # Аналогично для момента. Для x < b и x >= b формулы разные.
-
-    if x < 0 or x > L:
-        return 0.0
-
-    if x <= b:
-        # 0 <= x <= b
-        # Примерная формула (может отличаться в зависимости от соглашений о знаках)
-        return M * x * (L ** 2 - x ** 2) / (6 * E * I * L)
-    else:
-        # b <= x <= L
-        return M * b * (L - x) * (L ** 2 - (L - x) ** 2) / (6 * E * I * L * b)
+    x = np.asarray(x, dtype=float)
+    macaulay = np.maximum(x - b, 0.0)
+    w = M * (-x ** 3 + 3 * L * macaulay ** 2 + (L ** 2 - 3 * (L - b) ** 2) * x) / (6 * E * I * L)
+    return np.where((x < 0) | (x > L), 0.0, w)
 
 
 def compute_deflection_from_loads(z_array, params, E, I, L, N_F, N_M):
@@ -75,35 +61,71 @@ def compute_deflection_from_loads(z_array, params, E, I, L, N_F, N_M):
     N_M - количество моментов
 
     Возвращает массив того же размера, что и z_array, со значениями прогибов.
+    Если params - двумерный массив (P, 2*(N_F+N_M)), возвращается массив (P, len(z_array))
+    для всей пачки наборов нагрузок сразу.
     """
-    w_calc = np.zeros_like(z_array)
+    z_array = np.asarray(z_array, dtype=float)
+    params = np.asarray(params, dtype=float)
+    batched = params.ndim == 2
+    params = np.atleast_2d(params)
 
-    # Извлекаем F_k, a_k из params
     # Первая часть params: F1, a1, F2, a2, ...
     # Вторая часть: M1, b1, M2, b2, ...
+    moment_index = 2 * N_F
+    F = params[:, 0:moment_index:2, None]
+    a = params[:, 1:moment_index:2, None]
+    M = params[:, moment_index:moment_index + 2 * N_M:2, None]
+    b = params[:, moment_index + 1:moment_index + 2 * N_M:2, None]
 
-    # Индекс в params, где начинаются моменты:
-    moment_index = 2 * N_F  # т.к. на каждую силу 2 параметра (F, a)
-
-    # Силы
-    for i in range(N_F):
-        F_i = params[2 * i]
-        a_i = params[2 * i + 1]
-
-        # Добавляем вклад в прогиб
-        for j, x in enumerate(z_array):
-            w_calc[j] += deflection_single_force(x, F_i, a_i, E, I, L)
+    # Вклады всех нагрузок: (P, N, len(z)) -> сумма по нагрузкам
+    w_calc = deflection_single_force(z_array, F, a, E, I, L).sum(axis=1)
+    w_calc += deflection_single_moment(z_array, M, b, E, I, L).sum(axis=1)
 
-    # Моменты
-    for i in range(N_M):
-        idx = moment_index + 2 * i
-        M_i = params[idx]
-        b_i = params[idx + 1]
+    return w_calc if batched else w_calc[0]
 
-        for j, x in enumerate(z_array):
-            w_calc[j] += deflection_single_moment(x, M_i, b_i, E, I, L)
 
-    return w_calc
+def check_against_beam_solver(n_cases=20, n_points=202, N_F=3, N_M=2, E=2.0e8, I=1.0e-4, L=10.0, seed=None):
+    """
+    Сверка аналитической модели с численным прогибом BeamSolver.calculate_deflections_test
+    на случайных наборах нагрузок. Возвращает максимальную относительную погрешность
+    (max |w_exact - w_numeric| / max |w_exact| по худшему набору); seed - для воспроизводимости.
+    """
+    from core.beam_solver import BeamSolver
+
+    rng = np.random.default_rng(seed)
+    solver = BeamSolver(L, E, {'I': I, 'h': 0.1})
+    z_array = np.linspace(0, L, n_points)
+    worst = 0.0
+    for _ in range(n_cases):
+        params = []
+        loads = []
+        for load_type, count in (('point', N_F), ('moment', N_M)):
+            for _ in range(count):
+                value = rng.uniform(-1000, 1000)
+                position = rng.uniform(0, L)
+                params += [value, position]
+                loads.append({'type': load_type, 'value': value, 'position': position})
+        _, w_numeric = solver.calculate_deflections_test(loads, num_points=n_points)
+        w_exact = compute_deflection_from_loads(z_array, params, E, I, L, N_F, N_M)
+        worst = max(worst, np.max(np.abs(w_exact - w_numeric)) / np.max(np.abs(w_exact)))
+    return worst
+
+
+# Допуски сверки с BeamSolver: расхождение - ошибка дискретизации численного
+# интегрирования, убывает с измельчением сетки. Относительная ошибка худшего
+# из 20 случайных наборов сильно зависит от выборки (при почти взаимно
+# гасящихся нагрузках max|w| мал): 0.6-4.7% на 202 точках, 0.08-0.5% на 2000
+CHECK_TOL_COARSE = 5e-2   # 202 точки
+CHECK_TOL_FINE = 1e-2     # 2000 точек
+
+
+def test_analytic_matches_beam_solver():
+    """Аналитическая модель совпадает с численной в пределах ошибки дискретизации."""
+    coarse = check_against_beam_solver(n_points=202, seed=0)
+    fine = check_against_beam_solver(n_points=2000, seed=0)
+    assert coarse < CHECK_TOL_COARSE
+    assert fine < CHECK_TOL_FINE
+    assert fine < coarse
 
 
 # -------------------------------------------------------------
@@ -240,4 +262,5 @@ def main_optimization_example():
 # 5. Запуск примера
 # -------------------------------------------------------------
 if __name__ == "__main__":
+    print(f"Расхождение с BeamSolver: {check_against_beam_solver():.3e}")
     main_optimization_example()
@@ -0,0 +1,208 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.reverce_solver import FINE_GRID_FACTOR, _fit_derivatives, _extract_loads
+from core.reverse_problem_2_test import compute_deflection_from_loads
+
+# ---------------------- Синтетический размеченный набор --------------------
+L_TUNE = 10.0
+E_TUNE = 2.0e8
+I_TUNE = 1.0e-4
+N_POINTS = 200
+MAX_LOAD = 1000.0
+# Найденная нагрузка засчитывается, если она ближе POS_TOL к истинной
+POS_TOL = 0.25
+
+# ---------------------- Сетка гиперпараметров по умолчанию -----------------
+SMOOTHING_FACTORS = [1e-12, 1e-10, 1e-8, 1e-6, 1e-4, 1e-2]
+SEGMENT_LENGTHS = [0.25, 0.5, 1.0, 2.0]
+FORCE_THRESHOLDS = [10, 50, 100, 300]
+MOMENT_THRESHOLDS = [50, 200, 1000, 5000]
+
+
+def make_labelled_set(n_curves, max_forces=3, max_moments=2, seed=0):
+    """
+    Набор прогибов от случайных сосредоточенных нагрузок (аналитическая модель).
+    Возвращает сетку z, массив прогибов W (n_curves, len(z)) и список истинных нагрузок
+    для каждой кривой: [{'forces': [(a, F), ...], 'moments': [(b, M), ...]}, ...].
+    """
+    rng = np.random.default_rng(seed)
+    z = np.linspace(0, L_TUNE, N_POINTS + 2)
+    W = np.empty((n_curves, len(z)))
+    labels = []
+    for i in range(n_curves):
+        N_F = rng.integers(1, max_forces + 1)
+        N_M = rng.integers(0, max_moments + 1)
+        forces = [(rng.uniform(0.5, L_TUNE - 0.5), rng.uniform(-MAX_LOAD, MAX_LOAD)) for _ in range(N_F)]
+        moments = [(rng.uniform(0.5, L_TUNE - 0.5), rng.uniform(-MAX_LOAD, MAX_LOAD)) for _ in range(N_M)]
+        params = [v for a, F in forces for v in (F, a)] + [v for b, M in moments for v in (M, b)]
+        W[i] = compute_deflection_from_loads(z, params, E_TUNE, I_TUNE, L_TUNE, N_F, N_M)
+        labels.append({'forces': forces, 'moments': moments})
+    return z, W, labels
+
+
+def _match(found_positions, true_positions):
+    """
+    Жадное сопоставление найденных и истинных положений в пределах POS_TOL.
+    Возвращает число совпадений и сумму ошибок положения.
+    """
+    pairs = sorted(
+        (abs(f - t), i, j)
+        for i, f in enumerate(found_positions)
+        for j, t in enumerate(true_positions)
+        if abs(f - t) <= POS_TOL
+    )
+    used_found, used_true = set(), set()
+    pos_err = 0.0
+    for dist, i, j in pairs:
+        if i in used_found or j in used_true:
+            continue
+        used_found.add(i)
+        used_true.add(j)
+        pos_err += dist
+    return len(used_found), pos_err
+
+
+def score_detections(forces, moments, labels):
+    """
+    Точность восстановления по всему набору: F1 по сопоставлению положений
+    (силы и моменты вместе) и средняя ошибка положения совпавших нагрузок.
+    """
+    n_found = n_true = n_hit = 0
+    pos_err = 0.0
+    for found_f, found_m, label in zip(forces, moments, labels):
+        for found, true in ((found_f, label['forces']), (found_m, label['moments'])):
+            hits, err = _match([p for p, _ in found], [p for p, _ in true])
+            n_found += len(found)
+            n_true += len(true)
+            n_hit += hits
+            pos_err += err
+    precision = n_hit / n_found if n_found else 0.0
+    recall = n_hit / n_true if n_true else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'mean_pos_error': pos_err / n_hit if n_hit else np.nan,
+    }
+
+
+# ---------------------- Рабочий процесс пула --------------------------------
+_DATASET = None
+_FIT_CACHE = {}
+
+
+def _init_worker(z, W, labels):
+    global _DATASET
+    _DATASET = (z, W, labels)
+    _FIT_CACHE.clear()
+
+
+def _get_fits(smoothing_factor):
+    """
+    Производные всех кривых для данного smoothing_factor. Зависят только от него,
+    поэтому считаются один раз и переиспользуются во всех переборах порогов и сегментов.
+    """
+    if smoothing_factor not in _FIT_CACHE:
+        z, W, _ = _DATASET
+        fine_z = np.linspace(z[0], z[-1], FINE_GRID_FACTOR * len(z))
+        EI = E_TUNE * I_TUNE
+        t0 = time.perf_counter()
+        fine_q = np.empty((len(W), len(fine_z)))
+        fine_M = np.empty((len(W), len(fine_z)))
+        for b, w in enumerate(W):
+            _, _, _, fine_q[b], fine_M[b] = _fit_derivatives(z, w, EI, smoothing_factor, fine_z)
+        fit_time = (time.perf_counter() - t0) / len(W)
+        _FIT_CACHE[smoothing_factor] = (fine_z, fine_q, fine_M, fit_time)
+    return _FIT_CACHE[smoothing_factor]
+
+
+def evaluate_smoothing(smoothing_factor, segment_lengths, force_thresholds, moment_thresholds):
+    """
+    Перебор всех (segment_length, force_threshold, moment_threshold) при фиксированном
+    smoothing_factor на общем кэше сплайнов. Возвращает список строк таблицы результатов.
+    """
+    z, _, labels = _DATASET
+    fine_z, fine_q, fine_M, fit_time = _get_fits(smoothing_factor)
+    rows = []
+    for seg, f_thr, m_thr in itertools.product(segment_lengths, force_thresholds, moment_thresholds):
+        t0 = time.perf_counter()
+        forces, moments = _extract_loads(fine_z, fine_q, fine_M, z[-1], seg, f_thr, m_thr)
+        extract_time = (time.perf_counter() - t0) / len(labels)
+        row = {
+            'smoothing_factor': smoothing_factor,
+            'segment_length': seg,
+            'force_threshold': f_thr,
+            'moment_threshold': m_thr,
+            'time_per_curve_s': fit_time + extract_time,
+        }
+        row.update(score_detections(forces, moments, labels))
+        rows.append(row)
+    return rows
+
+
+def grid_search(z, W, labels,
+                smoothing_factors=SMOOTHING_FACTORS,
+                segment_lengths=SEGMENT_LENGTHS,
+                force_thresholds=FORCE_THRESHOLDS,
+                moment_thresholds=MOMENT_THRESHOLDS,
+                workers=None):
+    """
+    Параллельный перебор: одна задача пула - один smoothing_factor со всеми
+    остальными комбинациями. Результат - таблица, отсортированная по F1
+    (при равенстве - по ошибке положения и времени).
+    """
+    workers = workers or os.cpu_count() or 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(z, W, labels)) as exe:
+        chunks = exe.map(
+            evaluate_smoothing,
+            smoothing_factors,
+            itertools.repeat(segment_lengths),
+            itertools.repeat(force_thresholds),
+            itertools.repeat(moment_thresholds),
+        )
+        table = pd.DataFrame([row for chunk in chunks for row in chunk])
+    return table.sort_values(['f1', 'mean_pos_error', 'time_per_curve_s'],
+                             ascending=[False, True, True]).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Подбор параметров сплайнового решения обратной задачи")
+    parser.add_argument('--curves', '-n', type=int, default=200,
+                        help='Размер синтетического размеченного набора')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', '-w', type=int, default=None)
+    parser.add_argument('--out', '-o', default='results',
+                        help='Каталог для таблицы и лучшей конфигурации')
+    args = parser.parse_args()
+
+    z, W, labels = make_labelled_set(args.curves, seed=args.seed)
+    t0 = time.perf_counter()
+    table = grid_search(z, W, labels, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+
+    os.makedirs(args.out, exist_ok=True)
+    table.to_csv(os.path.join(args.out, 'spline_tuning.csv'), index=False)
+    best = table.iloc[0].to_dict()
+    with open(os.path.join(args.out, 'spline_tuning_best.json'), 'w', encoding='utf-8') as f:
+        json.dump(best, f, indent=2, ensure_ascii=False)
+
+    print("\n=== Лучшая конфигурация ===")
+    for key, value in best.items():
+        print(f"  {key}: {value}")
+    print("\n=== Топ-10 ===")
+    print(table.head(10).to_string(index=False))
+    print(f"\nПеребрано {len(table)} конфигураций за {elapsed:.1f} с. Результаты в '{args.out}'.")
+
+
+if __name__ == '__main__':
+    main()
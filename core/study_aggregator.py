@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+GROUP_FIELDS = ['N_modes', 'N_F', 'N_M']
+
+
+class StudyAggregator:
+    """
+    Потоковая агрегация результатов parameter study без повторного чтения истории.
+
+    Для каждой конфигурации (N_modes, N_F, N_M) хранятся число записей, среднее и
+    сумма квадратов отклонений error (Уэлфорд, пакеты объединяются по формуле Чана),
+    суммы time_s и iterations. Для лог-лог регрессии
+    log(mean_error) ~ log N_modes + log N_F + log N_M (как в analythis.regression_analysis)
+    хранятся суммы нормальных уравнений X^T X и X^T y по конфигурациям: при обновлении
+    группы её старая строка вычитается из сумм и добавляется новая. Параметры,
+    постоянные на всех учтённых конфигурациях (например, один N_modes), в решение
+    не входят и получают показатель 0, как в LinearRegression.
+    Записи, прерванные по пределу времени (timed_out) или с нечисловым error,
+    не учитываются.
+    Стоимость update - O(размер пакета), не зависит от объёма уже учтённых данных.
+    """
+
+    def __init__(self):
+        self._index = {}
+        self._keys = np.empty((0, 3))
+        self._count = np.empty(0)
+        self._mean = np.empty(0)
+        self._m2 = np.empty(0)
+        self._sum_time = np.empty(0)
+        self._sum_iters = np.empty(0)
+        # y конфигурации, учтённый сейчас в суммах регрессии (nan - не учтён)
+        self._row_y = np.empty(0)
+        self._xtx = np.zeros((4, 4))
+        self._xty = np.zeros(4)
+        # Диапазон каждого параметра по учтённым конфигурациям
+        self._key_min = np.full(3, np.inf)
+        self._key_max = np.full(3, -np.inf)
+
+    def __len__(self):
+        return len(self._index)
+
+    def _group_indices(self, keys):
+        """
+        Индексы конфигураций для уникальных ключей пакета (новые конфигурации добавляются).
+        """
+        new = [tuple(k) for k in keys if tuple(k) not in self._index]
+        if new:
+            start = len(self._index)
+            for i, key in enumerate(new):
+                self._index[key] = start + i
+            grow = len(new)
+            self._keys = np.vstack([self._keys, np.array(new, dtype=float)])
+            self._count = np.concatenate([self._count, np.zeros(grow)])
+            self._mean = np.concatenate([self._mean, np.zeros(grow)])
+            self._m2 = np.concatenate([self._m2, np.zeros(grow)])
+            self._sum_time = np.concatenate([self._sum_time, np.zeros(grow)])
+            self._sum_iters = np.concatenate([self._sum_iters, np.zeros(grow)])
+            self._row_y = np.concatenate([self._row_y, np.full(grow, np.nan)])
+        return np.array([self._index[tuple(k)] for k in keys], dtype=int)
+
+    def update(self, records):
+        """
+        Учесть пакет результатов: DataFrame или список записей хранилища.
+        """
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+        if df.empty:
+            return
+        # error прерванного запуска - не результат сходимости (как в AdaptiveScheduler)
+        valid = np.isfinite(pd.to_numeric(df['error'], errors='coerce').to_numpy(dtype=float))
+        if 'timed_out' in df:
+            valid &= ~df['timed_out'].fillna(False).astype(bool).to_numpy()
+        df = df[valid]
+        if df.empty:
+            return
+        keys, inverse = np.unique(df[GROUP_FIELDS].to_numpy(), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        idx = self._group_indices(keys)
+        self._key_min = np.minimum(self._key_min, keys.min(axis=0))
+        self._key_max = np.maximum(self._key_max, keys.max(axis=0))
+
+        # Статистики пакета по группам
+        error = df['error'].to_numpy(dtype=float)
+        n_b = np.bincount(inverse, minlength=len(keys)).astype(float)
+        mean_b = np.bincount(inverse, weights=error, minlength=len(keys)) / n_b
+        m2_b = np.bincount(inverse, weights=(error - mean_b[inverse]) ** 2, minlength=len(keys))
+
+        # Объединение с накопленными (Чан и др.)
+        n_a, mean_a = self._count[idx], self._mean[idx]
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        self._mean[idx] = mean_a + delta * n_b / n
+        self._m2[idx] += m2_b + delta ** 2 * n_a * n_b / n
+        self._count[idx] = n
+        if 'time_s' in df:
+            self._sum_time[idx] += np.bincount(inverse, weights=df['time_s'].to_numpy(dtype=float),
+                                               minlength=len(keys))
+        if 'iterations' in df:
+            self._sum_iters[idx] += np.bincount(inverse, weights=df['iterations'].to_numpy(dtype=float),
+                                                minlength=len(keys))
+
+        self._update_regression(idx)
+
+    def _update_regression(self, idx):
+        X = np.column_stack([np.ones(len(idx)), np.log(self._keys[idx])])
+        # Убираем старые строки затронутых конфигураций ...
+        old_y = self._row_y[idx]
+        had = ~np.isnan(old_y)
+        self._xtx -= X[had].T @ X[had]
+        self._xty -= X[had].T @ old_y[had]
+        # ... и добавляем новые (log определён только для положительного среднего)
+        mean = self._mean[idx]
+        ok = mean > 0
+        new_y = np.full(len(idx), np.nan)
+        new_y[ok] = np.log(mean[ok])
+        self._xtx += X[ok].T @ X[ok]
+        self._xty += X[ok].T @ new_y[ok]
+        self._row_y[idx] = new_y
+
+    def grouped(self):
+        """
+        Таблица по конфигурациям с теми же колонками, что analythis.summarize_data.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(self._m2 / (self._count - 1))
+        grouped = pd.DataFrame(self._keys.astype(int), columns=GROUP_FIELDS)
+        grouped['mean_error'] = self._mean
+        grouped['std_error'] = np.where(self._count > 1, std, np.nan)
+        grouped['mean_time'] = self._sum_time / self._count
+        grouped['mean_iters'] = self._sum_iters / self._count
+        grouped['count'] = self._count.astype(int)
+        return grouped.sort_values(GROUP_FIELDS).reset_index(drop=True)
+
+    def regression(self):
+        """
+        Решение нормальных уравнений: (C, exponents), mean_error ≈ C * prod(param^exponent).
+        Постоянные параметры в решение не входят, их показатель 0.
+        None, пока конфигураций меньше, чем оцениваемых коэффициентов.
+        """
+        varying = self._key_max > self._key_min
+        cols = np.flatnonzero(np.concatenate([[True], varying]))
+        if np.count_nonzero(~np.isnan(self._row_y)) < len(cols):
+            return None
+        # lstsq: оставшиеся параметры тоже могут оказаться линейно зависимыми
+        beta = np.linalg.lstsq(self._xtx[np.ix_(cols, cols)], self._xty[cols], rcond=None)[0]
+        exponents = np.zeros(3)
+        exponents[varying] = beta[1:]
+        return float(np.exp(beta[0])), exponents
+
+    def formula(self):
+        fit = self.regression()
+        if fit is None:
+            return "mean_error: not enough configurations yet"
+        C, coeffs = fit
+        return (f"mean_error ≈ {C:.3e} "
+                f"* N_modes^{coeffs[0]:.3f} "
+                f"* N_F^{coeffs[1]:.3f} "
+                f"* N_M^{coeffs[2]:.3f}")
@@ -0,0 +1,24 @@
+import numpy as np
+
+from core.analythis import regression_analysis
+from core.study_aggregator import StudyAggregator
+
+
+def test_regression_single_n_modes_matches_analythis(tmp_path):
+    rng = np.random.default_rng(0)
+    records = [dict(N_modes=3, N_F=f, N_M=m, repeat=r, time_s=1.0, iterations=10,
+                    error=0.03 * f ** -1.4 * m ** 1.0 * np.exp(rng.normal(0, 0.3)))
+               for f in range(1, 8) for m in range(1, 8) for r in range(3)]
+    # Прерванный запуск не должен попасть ни в средние, ни в регрессию
+    timed_out = dict(records[0], repeat=9, error=100.0, timed_out=True)
+    aggregator = StudyAggregator()
+    aggregator.update(records[:50])
+    aggregator.update(records[50:] + [timed_out])
+
+    grouped = aggregator.grouped()
+    assert grouped['count'].sum() == len(records)
+    C, exponents = aggregator.regression()
+    reg, _, _ = regression_analysis(grouped, str(tmp_path), n_boot=0)
+    assert exponents[0] == 0.0
+    assert np.allclose(exponents, reg.coef_)
+    assert np.isclose(C, np.exp(reg.intercept_))
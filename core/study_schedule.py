@@ -0,0 +1,41 @@
+import heapq
+
+import numpy as np
+
+
+def lpt_order(tasks, costs):
+    """
+    Longest Processing Time first: задания по убыванию предсказанной стоимости,
+    при равенстве - в исходном порядке.
+    """
+    order = np.argsort(-np.asarray(costs), kind='stable')
+    return [tasks[i] for i in order]
+
+
+def list_schedule_makespan(durations, workers):
+    """
+    Длительность всего расчёта при жадной выдаче заданий в данном порядке
+    первому освободившемуся из workers работников (так работает пул процессов).
+    """
+    finish = [0.0] * workers
+    for d in durations:
+        heapq.heappush(finish, heapq.heappop(finish) + d)
+    return max(finish) if durations else 0.0
+
+
+def makespan_report(durations, workers, run_order_keys):
+    """
+    Сравнение порядков выдачи на фактических длительностях заданий этого запуска:
+    makespan в порядке запуска, в исходном порядке сетки и нижняя граница
+    max(sum / workers, самое долгое задание).
+    durations - {ключ записи (N_modes, N_F, N_M, repeat): time_s};
+    run_order_keys - ключи в порядке выдачи (может быть ленивым итератором).
+    Порядок сетки - это порядок сортировки ключей.
+    """
+    run_durations = [durations[key] for key in run_order_keys if key in durations]
+    grid_durations = [durations[key] for key in sorted(durations)]
+    return {
+        'run_order': list_schedule_makespan(run_durations, workers),
+        'grid_order': list_schedule_makespan(grid_durations, workers),
+        'lower_bound': max(sum(run_durations) / workers, max(run_durations, default=0.0)),
+    }
@@ -0,0 +1,327 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+# Через сколько секунд без heartbeat задание считается брошенным и возвращается в очередь
+LEASE_TIMEOUT = 120.0
+# Период heartbeat у работника
+HEARTBEAT_INTERVAL = 10.0
+# Сколько раз задание может быть выдано повторно, прежде чем будет помечено failed
+MAX_ATTEMPTS = 3
+# Методы очереди, доступные работникам других машин через QueueServer
+WORKER_METHODS = ('claim', 'heartbeat', 'complete', 'fail', 'counts')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    key        TEXT PRIMARY KEY,
+    payload    TEXT NOT NULL,
+    status     TEXT NOT NULL DEFAULT 'pending',
+    worker     TEXT,
+    heartbeat  REAL,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    result     TEXT,
+    error      TEXT,
+    collected  INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    Очередь заданий на SQLite без внешних сервисов. Координатор публикует задания
+    и забирает результаты, работники атомарно захватывают задания, шлют heartbeat
+    и возвращают результаты. Файл базы лежит на локальном диске координатора
+    (режим WAL не работает на сетевых файловых системах): работники этой машины
+    открывают его напрямую, работники других машин обращаются к нему через
+    QueueServer (см. open_work_queue).
+    Задания работников, переставших слать heartbeat дольше lease_timeout,
+    возвращаются в очередь при следующем захвате.
+
+    Статусы: pending -> running -> done | failed.
+    """
+
+    def __init__(self, path, lease_timeout=LEASE_TIMEOUT):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: транзакции управляются явно (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    # ---------------------------------------------------------- координатор
+    def publish(self, tasks, reset=False):
+        """
+        Добавить задания (кортежи); уже имеющиеся в очереди не дублируются.
+        Повторно опубликованное задание снова становится pending, если оно
+        завершилось ошибкой (failed) или его результат уже забран координатором
+        (done, collected) - раз задание публикуется, в хранилище результата нет.
+        reset=True (--force) - вернуть в очередь все повторно опубликованные
+        задания, кроме выполняющихся сейчас.
+        Возвращает число заданий, поставленных в очередь (новых и возвращённых).
+        """
+        if reset:
+            condition = "tasks.status != 'running'"
+        else:
+            condition = "tasks.status = 'failed' OR (tasks.status = 'done' AND tasks.collected = 1)"
+        rows = ((json.dumps(list(t)), json.dumps(list(t))) for t in tasks)
+        with self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO tasks(key, payload) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET status = 'pending', worker = NULL, heartbeat = NULL, "
+                "attempts = 0, result = NULL, error = NULL, collected = 0 "
+                f"WHERE {condition}",
+                rows
+            )
+            return self._conn.total_changes - before
+
+    def collect_results(self):
+        """
+        Результаты выполненных заданий, ещё не забранные координатором.
+        """
+        with self._transaction():
+            rows = self._conn.execute(
+                "SELECT key, result FROM tasks WHERE status = 'done' AND collected = 0"
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE tasks SET collected = 1 WHERE key = ?", [(key,) for key, _ in rows]
+            )
+        return [json.loads(result) for _, result in rows]
+
+    def reclaim_expired(self):
+        """
+        Вернуть в очередь задания, чей работник молчит дольше lease_timeout.
+        Возвращает число возвращённых заданий.
+        """
+        with self._transaction():
+            return self._reclaim_expired()
+
+    def _reclaim_expired(self):
+        deadline = time.time() - self.lease_timeout
+        self._conn.execute(
+            "UPDATE tasks SET status = 'failed', error = 'lease expired too many times' "
+            "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+            (deadline, MAX_ATTEMPTS),
+        )
+        cur = self._conn.execute(
+            "UPDATE tasks SET status = 'pending', worker = NULL "
+            "WHERE status = 'running' AND heartbeat < ?",
+            (deadline,),
+        )
+        return cur.rowcount
+
+    def counts(self):
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(rows))
+        return counts
+
+    # ------------------------------------------------------------- работник
+    def claim(self, worker_id):
+        """
+        Атомарно захватить одно задание (в порядке публикации). Возвращает кортеж
+        задания или None, если свободных заданий нет.
+        """
+        with self._transaction():
+            self._reclaim_expired()
+            row = self._conn.execute(
+                "SELECT key, payload FROM tasks WHERE status = 'pending' ORDER BY rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            key, payload = row
+            self._conn.execute(
+                "UPDATE tasks SET status = 'running', worker = ?, heartbeat = ?, "
+                "attempts = attempts + 1 WHERE key = ?",
+                (worker_id, time.time(), key),
+            )
+        return tuple(json.loads(payload))
+
+    def heartbeat(self, worker_id, task):
+        """
+        Продлить аренду задания. False - задание уже отобрано (работник считался мёртвым).
+        """
+        with self._transaction():
+            cur = self._conn.execute(
+                "UPDATE tasks SET heartbeat = ? WHERE key = ? AND worker = ? AND status = 'running'",
+                (time.time(), json.dumps(list(task)), worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, worker_id, task, result):
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, heartbeat = ? "
+                "WHERE key = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result, ensure_ascii=False), time.time(), json.dumps(list(task)), worker_id),
+            )
+
+    def fail(self, worker_id, task, error):
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE tasks SET status = 'failed', error = ? "
+                "WHERE key = ? AND worker = ? AND status = 'running'",
+                (str(error), json.dumps(list(task)), worker_id),
+            )
+
+
+class _ServedQueue:
+    """
+    Очередь, которую QueueServer отдаёт работникам: сервер обслуживает каждое
+    подключение в своём потоке, а соединения sqlite3 между потоками не разделяются,
+    поэтому у каждого потока своя WorkQueue над тем же файлом.
+    """
+
+    def __init__(self, path, lease_timeout):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self._local = threading.local()
+
+    def _queue(self):
+        if not hasattr(self._local, 'queue'):
+            self._local.queue = WorkQueue(self.path, self.lease_timeout)
+        return self._local.queue
+
+    def claim(self, worker_id):
+        return self._queue().claim(worker_id)
+
+    def heartbeat(self, worker_id, task):
+        return self._queue().heartbeat(worker_id, task)
+
+    def complete(self, worker_id, task, result):
+        self._queue().complete(worker_id, task, result)
+
+    def fail(self, worker_id, task, error):
+        self._queue().fail(worker_id, task, error)
+
+    def counts(self):
+        return self._queue().counts()
+
+
+# Очередь процесса сервера (заполняется в _init_served_queue)
+_SERVED = {}
+
+
+def _init_served_queue(path, lease_timeout):
+    _SERVED['queue'] = _ServedQueue(path, lease_timeout)
+
+
+def _served_queue():
+    return _SERVED['queue']
+
+
+class _QueueManager(BaseManager):
+    pass
+
+
+_QueueManager.register('work_queue', callable=_served_queue, exposed=WORKER_METHODS)
+
+
+class QueueServer:
+    """
+    Сервер очереди для работников на других машинах: отдельный процесс
+    multiprocessing.managers, слушающий address = (host, port) и пускающий
+    только клиентов с тем же authkey (bytes). Задания и результаты хранятся
+    в той же базе path на локальном диске координатора.
+    """
+
+    def __init__(self, path, address, authkey, lease_timeout=LEASE_TIMEOUT):
+        self._manager = _QueueManager(address=address, authkey=authkey)
+        self._initargs = (path, lease_timeout)
+
+    def __enter__(self):
+        self._manager.start(_init_served_queue, self._initargs)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._manager.shutdown()
+
+
+class RemoteWorkQueue:
+    """
+    Подключение работника к QueueServer: те же методы работника, что у WorkQueue.
+    Если координатор ещё не запустил сервер, конструктор бросает ConnectionRefusedError;
+    после остановки сервера вызовы бросают EOFError или ConnectionError.
+    """
+
+    def __init__(self, address, authkey):
+        manager = _QueueManager(address=address, authkey=authkey)
+        manager.connect()
+        self._queue = manager.work_queue()
+
+    def close(self):
+        self._queue = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def claim(self, worker_id):
+        return self._queue.claim(worker_id)
+
+    def heartbeat(self, worker_id, task):
+        return self._queue.heartbeat(worker_id, task)
+
+    def complete(self, worker_id, task, result):
+        self._queue.complete(worker_id, task, result)
+
+    def fail(self, worker_id, task, error):
+        self._queue.fail(worker_id, task, str(error))
+
+    def counts(self):
+        return self._queue.counts()
+
+
+def parse_address(text):
+    """'host:port' -> (host, port)."""
+    host, _, port = text.rpartition(':')
+    return host, int(port)
+
+
+def open_work_queue(source):
+    """
+    Очередь для работника: source - путь к файлу очереди (работник на машине
+    координатора) или пара (address, authkey) сервера очереди (QueueServer).
+    """
+    if isinstance(source, tuple):
+        return RemoteWorkQueue(*source)
+    return WorkQueue(source)
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
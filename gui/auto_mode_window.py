@@ -1,10 +1,11 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QSplitter, QComboBox, QSlider, QLabel
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QSplitter, QComboBox, QSlider, QLabel, QSpinBox
 from PySide6.QtCore import Qt
 from gui.beam_visualization_widget import BeamVisualizationWidget
 from gui.plot_widget import PlotWidget
 from core.beam_solver import BeamSolver
-from core.beam_load_simulator import BeamLoadSimulator
+from core.beam_load_simulator import BeamLoadSimulator, DEFAULT_RATE_HZ
 from core.beam_loader import BeamLoader
+from core.beam_compute_worker import BeamComputeWorker
 
 class AutoModeWindow(QWidget):
     def __init__(self):
@@ -25,8 +26,17 @@ class AutoModeWindow(QWidget):
 
         self.num_forces = 1
         self.num_moments = 1
+        self.rendered_frames = 0
+
+        # Расчёт - в отдельном потоке; в потоке интерфейса только отрисовка
+        self.compute_worker = BeamComputeWorker(self.solver, self.profile_params['critical_stress'])
+        self.compute_worker.result_ready.connect(self.render_result)
+        self.compute_worker.start()
+
         self.load_simulator = BeamLoadSimulator(beam_length=self.beam_length, num_forces=self.num_forces, num_moments=self.num_moments)
-        self.load_simulator.update_signal.connect(self.update_calculations)
+        # DirectConnection: снимок нагрузок передаётся расчёту прямо из потока симулятора,
+        # минуя очередь событий интерфейса
+        self.load_simulator.update_signal.connect(self.compute_worker.submit, Qt.DirectConnection)
         self.load_simulator.start()
 
         self.beam_vis_widget = BeamVisualizationWidget()
@@ -57,6 +67,17 @@ class AutoModeWindow(QWidget):
         control_layout.addWidget(QLabel("Количество моментов:"))
         control_layout.addWidget(self.moment_slider)
 
+        self.rate_spin = QSpinBox()
+        self.rate_spin.setRange(1, 200)
+        self.rate_spin.setValue(int(DEFAULT_RATE_HZ))
+        self.rate_spin.setSuffix(" Гц")
+        self.rate_spin.valueChanged.connect(self.load_simulator.set_rate)
+        control_layout.addWidget(QLabel("Частота обновления нагрузок:"))
+        control_layout.addWidget(self.rate_spin)
+
+        self.frames_label = QLabel()
+        control_layout.addWidget(self.frames_label)
+
         control_panel.setLayout(control_layout)
 
         right_splitter = QSplitter(Qt.Vertical)
@@ -76,7 +97,8 @@ class AutoModeWindow(QWidget):
         profile_name = self.profile_combo.currentText()
         self.profile_params = self.loader.get_profile(profile_name)
         self.solver = BeamSolver(self.beam_length, E=2e11, profile_params=self.profile_params)
-        self.update_calculations(self.load_simulator.forces, self.load_simulator.moments)
+        self.compute_worker.set_solver(self.solver, self.profile_params['critical_stress'])
+        self.compute_worker.submit(self.load_simulator.forces, self.load_simulator.moments)
 
     def update_num_forces(self, value):
         self.num_forces = value
@@ -88,61 +110,24 @@ class AutoModeWindow(QWidget):
         self.load_simulator.num_moments = value
         self.load_simulator.moments = self.load_simulator._generate_initial_loads('moment', value)
 
-    def update_calculations(self, forces, moments):
-        forces_dict = [{"type": "point", "value": f['value'], "position": f['position']} for f in forces]
-        moments_dict = [{"type": "moment", "value": m['value'], "position": m['position']} for m in moments]
-        loads = forces_dict + moments_dict
-
-        x_moment, moments_data = self.solver.calculate_moments(loads)
-        stresses = self.solver.calculate_stresses(moments_data)
-        x_defl, deflections = self.solver.calculate_deflections_test(loads)
-        x_transverse, transverse_forces = self.solver.calculate_transverse_forces(forces_dict)
-
-        data = {
-            'moment_diagram': (x_moment, moments_data),
-            'deflections': (x_defl, deflections),
-            'stresses': (x_moment, stresses),
-            'transverse_forces': (x_transverse, transverse_forces),
-            'critical_stress': self.profile_params['critical_stress'],
-            'forces': forces_dict,
-            'applied_moments': moments_dict
-        }
-
+    def render_result(self):
+        """Отрисовка самого свежего готового расчёта (устаревшие пропускаются)."""
+        data = self.compute_worker.take_result()
+        if data is None:
+            return
         self.plot_widget.update_plots(data)
         self.beam_vis_widget.update_visualization(
             data['stresses'][0], data['stresses'][1],
             data['critical_stress'], data['forces'], data['applied_moments']
         )
-
-    def update_calculations(self, forces, moments):
-        """Обновляет расчёты и передаёт их в виджеты."""
-        forces_dict = [{"type": "point", "value": f['value'], "position": f['position']} for f in forces]
-        moments_dict = [{"type": "moment", "value": m['value'], "position": m['position']} for m in moments]
-
-        loads = forces_dict + moments_dict
-
-        x_moment, moments_data = self.solver.calculate_moments(loads)
-        stresses = self.solver.calculate_stresses(moments_data)
-        x_defl, deflections = self.solver.calculate_deflections_test(loads)
-        x_transverse, transverse_forces = self.solver.calculate_transverse_forces(forces_dict)
-
-        data = {
-            'moment_diagram': (x_moment, moments_data),
-            'deflections': (x_defl, deflections),
-            'stresses': (x_moment, stresses),
-            'transverse_forces': (x_transverse, transverse_forces),
-            'critical_stress': self.profile_params['critical_stress'],
-            'forces': forces_dict,
-            'applied_moments': moments_dict
-        }
-
-        self.plot_widget.update_plots(data)
-        self.beam_vis_widget.update_visualization(
-            data['stresses'][0], data['stresses'][1],
-            data['critical_stress'], data['forces'], data['applied_moments']
+        self.rendered_frames += 1
+        self.frames_label.setText(
+            f"Кадров: {self.rendered_frames}, пропущено: "
+            f"{self.compute_worker.frames_computed - self.rendered_frames + self.compute_worker.frames_dropped}"
         )
 
     def closeEvent(self, event):
         self.load_simulator.stop()
+        self.compute_worker.stop()
         event.accept()
 
@@ -1,11 +1,31 @@
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.cm import ScalarMappable
+from matplotlib.collections import LineCollection
+from matplotlib.colors import LinearSegmentedColormap, Normalize
 import numpy as np
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QCheckBox
 from scipy.ndimage import gaussian_filter1d
 
+# Ширина ядра сглаживания напряжений (в узлах сетки)
+SMOOTH_SIGMA = 0.1
+# Положение подписей сил и моментов под балкой (в координатах оси y)
+FORCE_LABEL_Y = -0.15
+MOMENT_LABEL_Y = -0.25
+
+
 class BeamVisualizationWidget(QWidget):
+    """
+    Полоса напряжений вдоль балки с маркерами нагрузок.
+
+    Все артисты создаются один раз: изображение обновляется через set_data
+    готовыми RGBA-пикселями (таблица цветов посчитана заранее), маркеры нагрузок -
+    два LineCollection, подписи берутся из пула Text и лишние скрываются.
+    Заголовок и цветовая шкала кэшируются как фон, на каждом кадре перерисовываются
+    только изображение, маркеры и подписи (blitting). Полная перерисовка - при
+    изменении critical_stress (шкала), границ балки и размера окна.
+    """
+
     def __init__(self, parent=None):
         super(BeamVisualizationWidget, self).__init__(parent)
 
@@ -22,6 +42,8 @@ class BeamVisualizationWidget(QWidget):
         colors_5 = ["#8561A8", "#5D92C4", "#63BFA1", "#EFC94C", "#E57373", "#9C6B6B"]
         colors_6 = ["#FFFFFF", "#FFE8A3", "#FFB878", "#FF6B6B", "#A52A2A", "#191919"]
         self.cmap = LinearSegmentedColormap.from_list("stress_cmap", colors_1)
+        # Таблица цветов: |напряжение| / critical_stress -> RGBA без пересчёта cmap на каждом кадре
+        self._lut = self.cmap(np.linspace(0, 1, self.cmap.N), bytes=True)
 
         self.smooth_checkbox = QCheckBox("Сглаженная визуализация", self)
 
@@ -38,6 +60,27 @@ class BeamVisualizationWidget(QWidget):
         self.last_loads = None
         self.last_moments = None  # Новый атрибут для хранения моментов
 
+        # Постоянные артисты
+        # animated=True: артисты не попадают в кэшируемый фон
+        self.image = self.ax.imshow(np.zeros((1, 2, 4), dtype=np.uint8), aspect='auto',
+                                    extent=[0, 1, 0, 1], interpolation="bilinear", animated=True)
+        self.force_markers = LineCollection([], colors='black', linestyles='solid', linewidths=1,
+                                            animated=True)
+        self.moment_markers = LineCollection([], colors='red', linestyles='solid', linewidths=1,
+                                             animated=True)
+        self.ax.add_collection(self.force_markers)
+        self.ax.add_collection(self.moment_markers)
+        self.force_labels = []
+        self.moment_labels = []
+        self.ax.set_ylim(-0.4, 1)
+
+        # Шкала строится по отдельному ScalarMappable с той же палитрой
+        self.stress_mappable = ScalarMappable(norm=Normalize(0, 1), cmap=self.cmap)
+        self.cbar = None
+
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
         self.smooth_checkbox.stateChanged.connect(self.on_smooth_changed)
 
     def on_smooth_changed(self, state):
@@ -50,6 +93,36 @@ class BeamVisualizationWidget(QWidget):
                 self.last_moments
             )
 
+    def _on_draw(self, event):
+        # После полной перерисовки (в т.ч. при изменении размера) обновляем фон
+        # и дорисовываем поверх него изменяемые артисты. Чужие холсты (savefig) пропускаем
+        if event is not None and event.canvas is not self.canvas:
+            return
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in [self.image, self.force_markers, self.moment_markers,
+                       *self.force_labels, *self.moment_labels]:
+            self.ax.draw_artist(artist)
+
+    def _update_labels(self, pool, items, y, unit, color):
+        # Пул подписей растёт до максимального числа нагрузок; лишние скрываются
+        while len(pool) < len(items):
+            pool.append(self.ax.text(0, y, "", ha='center', va='top', color=color, fontsize=8,
+                                     animated=True))
+        for text, (position, value) in zip(pool, items):
+            text.set_position((position, y))
+            text.set_text(f"{value:.1f} {unit}")
+            text.set_visible(True)
+        for text in pool[len(items):]:
+            text.set_visible(False)
+
+    @staticmethod
+    def _valid(loads):
+        return [(load['position'], load['value']) for load in loads
+                if isinstance(load, dict) and 'position' in load and 'value' in load]
+
     def update_visualization(self, x, stresses, critical_stress, loads, moments):
         self.last_x = x
         self.last_stresses = stresses
@@ -57,49 +130,46 @@ class BeamVisualizationWidget(QWidget):
         self.last_loads = loads
         self.last_moments = moments
 
-        self.ax.clear()
-        self.ax.set_axis_off()
-
-        vmin = 0
-        vmax = critical_stress
-
-        # Обработка сглаживания
-        smooth = self.smooth_checkbox.isChecked()
-        stresses_smooth = gaussian_filter1d(stresses, 0.1) if smooth else stresses
-
-        # Визуализация напряжений
-        img = np.abs(stresses_smooth)[np.newaxis, :]
-        self.ax.imshow(img, aspect='auto', cmap=self.cmap,
-                      extent=[x[0], x[-1], 0, 1], vmin=vmin, vmax=vmax, interpolation="bilinear")
-
-        for load in loads:
-            if isinstance(load, dict) and 'position' in load and 'value' in load:
-                position = load['position']
-                value = load['value']
-                marker_height = abs(value) / self.max_load_reference
-                self.ax.vlines(position, 0, marker_height,
-                             colors='black', linestyles='solid', linewidths=1)
-                self.ax.text(position, -0.15, f"{value:.1f} N",
-                            ha='center', va='top', color='black', fontsize=8)
-
-        for moment in moments:
-            if isinstance(moment, dict) and 'position' in moment and 'value' in moment:
-                position = moment['position']
-                value = moment['value']
-                marker_height = abs(value) / self.max_moment_reference
-                self.ax.vlines(position, 0, marker_height,
-                             colors='red', linestyles='solid', linewidths=1)
-                self.ax.text(position, -0.25, f"{value:.1f} Nm",
-                            ha='center', va='top', color='red', fontsize=8)
-
-        self.ax.set_ylim(-0.4, 1)
-        self.ax.set_xlim(x[0], x[-1])
-
-        if not hasattr(self, 'cbar'):
-            self.cbar = self.figure.colorbar(self.ax.images[0], ax=self.ax,
-                                           orientation='horizontal', pad=0.25)
-            self.cbar.set_label('Напряжение (Па)')
-        else:
-            self.cbar.update_normal(self.ax.images[0])
-
-        self.canvas.draw()
\ No newline at end of file
+        # Обработка сглаживания (радиус ядра gaussian_filter1d - int(4*sigma + 0.5) узлов;
+        # при нулевом радиусе фильтр тождественен и не вызывается)
+        smooth = self.smooth_checkbox.isChecked() and int(4.0 * SMOOTH_SIGMA + 0.5) > 0
+        stresses_smooth = gaussian_filter1d(stresses, SMOOTH_SIGMA) if smooth else stresses
+
+        # Визуализация напряжений: индекс в таблице цветов, как у imshow(vmin=0, vmax=critical_stress)
+        n_colors = len(self._lut)
+        level = np.abs(np.asarray(stresses_smooth, dtype=float)) * (n_colors / critical_stress)
+        idx = np.clip(level.astype(int), 0, n_colors - 1)
+        self.image.set_data(self._lut[idx][np.newaxis, :, :])
+        full_redraw = self._background is None
+        extent = [x[0], x[-1], 0, 1]
+        if list(self.image.get_extent()) != extent:
+            self.image.set_extent(extent)
+            self.ax.set_xlim(x[0], x[-1])
+            full_redraw = True
+
+        forces = self._valid(loads)
+        applied_moments = self._valid(moments)
+        self.force_markers.set_segments(
+            [[(p, 0), (p, abs(v) / self.max_load_reference)] for p, v in forces])
+        self.moment_markers.set_segments(
+            [[(p, 0), (p, abs(v) / self.max_moment_reference)] for p, v in applied_moments])
+        self._update_labels(self.force_labels, forces, FORCE_LABEL_Y, "N", 'black')
+        self._update_labels(self.moment_labels, applied_moments, MOMENT_LABEL_Y, "Nm", 'red')
+
+        if self.cbar is None or self.stress_mappable.norm.vmax != critical_stress:
+            self.stress_mappable.norm.vmax = critical_stress
+            if self.cbar is None:
+                self.cbar = self.figure.colorbar(self.stress_mappable, ax=self.ax,
+                                                 orientation='horizontal', pad=0.25)
+                self.cbar.set_label('Напряжение (Па)')
+            else:
+                self.cbar.update_normal(self.stress_mappable)
+            full_redraw = True
+
+        if full_redraw:
+            # draw_event -> _on_draw: новый фон + изменяемые артисты
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.figure.bbox)
@@ -1,8 +1,17 @@
 from PySide6.QtWidgets import QWidget, QPushButton, QSlider, QLabel, QComboBox, QHBoxLayout, QFormLayout, QSpacerItem, QSizePolicy
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtCore import Signal, Qt, QTimer
 from core.beam_loader import BeamLoader
 from core.beam_solver import BeamSolver
 
+# Задержка пересчёта после последнего изменения, мс: серия быстрых нажатий
+# (добавление/удаление нагрузок, смена профиля) даёт один пересчёт и одну перерисовку
+UPDATE_DEBOUNCE_MS = 50
+
+
+def _loads_key(loads):
+    return tuple((load['type'], load['value'], load['position']) for load in loads)
+
+
 class ControlPanel(QWidget):
     update_signal = Signal(dict)
 
@@ -81,6 +90,15 @@ class ControlPanel(QWidget):
         self.length = 5.0
         self.E = 2e11
 
+        # Решатели по профилям и последние рассчитанные компоненты эпюр (см. _cached)
+        self._solvers = {}
+        self._cache = {}
+
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(UPDATE_DEBOUNCE_MS)
+        self._update_timer.timeout.connect(self._recompute)
+
         self.add_load_button.clicked.connect(self.add_load)
         self.remove_load_button.clicked.connect(self.remove_load)
         self.force_value_slider.valueChanged.connect(self.update_force_label)
@@ -131,17 +149,48 @@ class ControlPanel(QWidget):
         self.moment_position_label.setText(f"{value}%")
 
     def update_data(self):
+        """
+        Планирует пересчёт: таймер перезапускается при каждом изменении,
+        поэтому серия изменений подряд обрабатывается одним вызовом _recompute.
+        """
+        self._update_timer.start()
+
+    def _solver(self, profile_name, profile_params):
+        solver = self._solvers.get(profile_name)
+        if solver is None:
+            solver = BeamSolver(self.length, self.E, profile_params)
+            self._solvers[profile_name] = solver
+        return solver
+
+    def _cached(self, name, key, compute):
+        # Одна запись на компонент: пересчёт только при изменении его входных данных
+        entry = self._cache.get(name)
+        if entry is None or entry[0] != key:
+            entry = (key, compute())
+            self._cache[name] = entry
+        return entry[1]
+
+    def _recompute(self):
         try:
             profile_name = self.profile_combo.currentText()
             profile_params = self.loader.get_profile(profile_name)
 
-            solver = BeamSolver(self.length, self.E, profile_params)
+            solver = self._solver(profile_name, profile_params)
 
             combined_loads = self.forces + self.moments
-            x_moment, moments = solver.calculate_moments(combined_loads, num_points=1000)
+            loads_key = _loads_key(combined_loads)
+            # Моменты и поперечные силы не зависят от профиля, прогибы - только от E·I
+            # (при смене профиля с тем же I, но другим h пересчитываются лишь напряжения)
+            x_moment, moments = self._cached(
+                'moments', (loads_key, self.length),
+                lambda: solver.calculate_moments(combined_loads, num_points=1000))
             stresses = solver.calculate_stresses(moments)
-            x_defl, deflections = solver.calculate_deflections_test(combined_loads)
-            x_transverse, transverse_forces = solver.calculate_transverse_forces(self.forces)
+            x_defl, deflections = self._cached(
+                'deflections', (loads_key, self.length, self.E * solver.I),
+                lambda: solver.calculate_deflections_test(combined_loads))
+            x_transverse, transverse_forces = self._cached(
+                'transverse_forces', (_loads_key(self.forces), self.length),
+                lambda: solver.calculate_transverse_forces(self.forces))
 
             data = {
                 'moment_diagram': (x_moment, moments),  # Эпюра моментов
@@ -1,55 +1,131 @@
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PySide6.QtWidgets import QWidget, QVBoxLayout
 
+# Описание графиков: ключ данных, цвет, подпись легенды, подпись оси y
+PANELS = [
+    ('moment_diagram', 'blue', 'Моменты', "Момент (Н·м)"),
+    ('deflections', 'green', 'Прогибы', "Прогиб (м)"),
+    ('transverse_forces', 'magenta', 'Поперечные силы', "Сила (Н)"),
+]
+# Запас по оси y при перемасштабировании (доля размаха данных)
+Y_MARGIN = 0.1
+# Пределы сужаются, если данные занимают меньше этой доли диапазона оси
+Y_SHRINK = 0.25
+
+
 class PlotWidget(QWidget):
+    """
+    Эпюры моментов, прогибов и поперечных сил.
+
+    Линии и заливки создаются один раз и обновляются через set_data / set_verts;
+    статичная часть (оси, сетка, подписи, легенды) кэшируется как фон и при
+    обновлении восстанавливается, после чего перерисовываются только линии
+    и заливки (blitting). Полная перерисовка - только когда данные выходят
+    за пределы осей (или сжимаются много меньше их) и при изменении размера.
+    """
+
     def __init__(self, parent=None):
         super(PlotWidget, self).__init__(parent)
 
         self.figure, self.axes = plt.subplots(3, 1, figsize=(10, 8), sharex=True)
         self.canvas = FigureCanvas(self.figure)
-        self.axes[0].set_title("")
-        self.axes[1].set_title("")
-        self.axes[2].set_title("")
-        for ax in self.axes:
-            ax.grid(True)
+
+        self.lines = {}
+        self.fills = {}
+        self.legends = []
+        for ax, (key, color, label, ylabel) in zip(self.axes, PANELS):
+            ax.set_title("")
+            # animated=True: артисты не попадают в кэшируемый фон
+            line, = ax.plot([], [], '-', color=color, label=label, linewidth=1.5, animated=True)
+            fill = ax.fill_between([0, 1], [0, 0], color=color, alpha=0.15, animated=True)
+            line.set_visible(False)
+            fill.set_visible(False)
+            self.lines[key] = line
+            self.fills[key] = fill
+            ax.set_ylabel(ylabel, fontsize=12)
+            ax.grid(True, which='both', linestyle='--', linewidth=0.5, alpha=0.7)  # Плотная сетка
+            ax.axhline(0, color='black', linewidth=2.5, alpha=0.9)  # Жирная ось y=0
+            # Образец линии - отдельный статичный артист (у animated-линии его не будет)
+            legend = ax.legend(handles=[Line2D([], [], color=color, linewidth=1.5, label=label)],
+                               fontsize=10, loc='upper right')
+            self.legends.append(legend)
+        self.axes[2].set_xlabel("Позиция (м)", fontsize=12)
+
+        self._background = None
+        self._legend_boxes = []
+        self.canvas.mpl_connect('draw_event', self._on_draw)
 
         layout = QVBoxLayout(self)
         layout.addWidget(self.canvas)
 
+    def _on_draw(self, event):
+        # После полной перерисовки (в т.ч. при изменении размера) обновляем фон
+        # и дорисовываем поверх него линии и заливки. Чужие холсты (savefig) пропускаем
+        if event is not None and event.canvas is not self.canvas:
+            return
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        renderer = self.canvas.get_renderer()
+        # Прямоугольники легенд в пикселях сохранённого фона (начало - левый верхний угол)
+        height = self.figure.bbox.height
+        self._legend_boxes = []
+        for legend in self.legends:
+            x0, y0, x1, y1 = legend.get_window_extent(renderer).extents
+            self._legend_boxes.append((np.floor(x0), np.floor(height - y1), np.ceil(x1), np.ceil(height - y0)))
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for ax, (key, *_) in zip(self.axes, PANELS):
+            ax.draw_artist(self.fills[key])
+            ax.draw_artist(self.lines[key])
+        # Легенды - поверх линий: копируем их пиксели из фона (дешевле, чем рисовать текст)
+        for box in self._legend_boxes:
+            # xy - положение начала сохранённого фона (весь рисунок), а не bbox
+            self.canvas.restore_region(self._background, bbox=box, xy=(0, 0))
+
+    def _needs_rescale(self, ax, x, y):
+        x0, x1 = ax.get_xlim()
+        y0, y1 = ax.get_ylim()
+        lo, hi = np.min(y), np.max(y)
+        if x[0] < x0 or x[-1] > x1 or lo < y0 or hi > y1:
+            return True
+        # размах считается, как в _rescale, вместе с осью y=0
+        span = max(hi, 0.0) - min(lo, 0.0)
+        return 0 < span < Y_SHRINK * (y1 - y0)
+
+    def _rescale(self, ax, x, y):
+        lo, hi = float(np.min(y)), float(np.max(y))
+        # ось y=0 всегда в поле зрения, как и у заливки
+        lo, hi = min(lo, 0.0), max(hi, 0.0)
+        margin = Y_MARGIN * (hi - lo) if hi > lo else 1.0
+        ax.set_xlim(x[0], x[-1])
+        ax.set_ylim(lo - margin, hi + margin)
+
     def update_plots(self, data):
-        for ax in self.axes:
-            ax.clear()
-
-        if 'moment_diagram' in data:
-            x_moment, moments = data['moment_diagram']
-            ax_moment = self.axes[0]
-            ax_moment.plot(x_moment, moments, 'b-', label='Моменты', linewidth=1.5)  # Линия графика
-            ax_moment.fill_between(x_moment, moments, color='blue', alpha=0.15)  # Заливка с прозрачностью
-            ax_moment.set_ylabel("Момент (Н·м)", fontsize=12)
-            ax_moment.grid(True, which='both', linestyle='--', linewidth=0.5, alpha=0.7)  # Плотная сетка
-            ax_moment.axhline(0, color='black', linewidth=2.5, alpha=0.9)  # Жирная ось y=0
-            ax_moment.legend(fontsize=10, loc='best')  # Легенда
-
-        if 'deflections' in data:
-            x_defl, deflections = data['deflections']
-            ax_defl = self.axes[1]
-            ax_defl.plot(x_defl, deflections, 'g-', label='Прогибы', linewidth=1.5)
-            ax_defl.fill_between(x_defl, deflections, color='green', alpha=0.15)
-            ax_defl.set_ylabel("Прогиб (м)", fontsize=12)
-            ax_defl.grid(True, which='both', linestyle='--', linewidth=0.5, alpha=0.7)
-            ax_defl.axhline(0, color='black', linewidth=2.5, alpha=0.9)
-            ax_defl.legend(fontsize=10, loc='best')
-
-        if 'transverse_forces' in data:
-            x_trans, transverse = data['transverse_forces']
-            ax_trans = self.axes[2]
-            ax_trans.plot(x_trans, transverse, 'm-', label='Поперечные силы', linewidth=1.5)
-            ax_trans.fill_between(x_trans, transverse, color='magenta', alpha=0.15)
-            ax_trans.set_xlabel("Позиция (м)", fontsize=12)
-            ax_trans.set_ylabel("Сила (Н)", fontsize=12)
-            ax_trans.grid(True, which='both', linestyle='--', linewidth=0.5, alpha=0.7)
-            ax_trans.axhline(0, color='black', linewidth=2.5, alpha=0.9)
-            ax_trans.legend(fontsize=10, loc='best')
-
-        self.canvas.draw()
\ No newline at end of file
+        full_redraw = self._background is None
+        for ax, (key, *_) in zip(self.axes, PANELS):
+            line, fill = self.lines[key], self.fills[key]
+            if key not in data:
+                full_redraw |= line.get_visible()
+                line.set_visible(False)
+                fill.set_visible(False)
+                continue
+            x, y = (np.asarray(v, dtype=float) for v in data[key])
+            line.set_data(x, y)
+            # Многоугольник заливки между кривой и осью y=0
+            fill.set_verts([np.column_stack([np.r_[x, x[::-1]], np.r_[y, np.zeros_like(y)]])])
+            line.set_visible(True)
+            fill.set_visible(True)
+            if self._needs_rescale(ax, x, y):
+                self._rescale(ax, x, y)
+                full_redraw = True
+
+        if full_redraw:
+            # draw_event -> _on_draw: новый фон + линии
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.figure.bbox)
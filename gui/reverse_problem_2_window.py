@@ -1,4 +1,5 @@
 import sys
+import multiprocessing
 import json
 import os
 import time
@@ -10,16 +11,26 @@ import matplotlib.pyplot as plt
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton,
-    QLabel, QSpinBox, QDoubleSpinBox, QTextEdit, QProgressBar, QGroupBox
+    QLabel, QSpinBox, QDoubleSpinBox, QTextEdit, QProgressBar, QGroupBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
 )
+from PySide6.QtCore import QTimer
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 
 # Импорт необходимых функций/классов из calc_module и beam_solver
 from core.beam_solver import BeamSolver
 from core.calc_module import (
     L_GLOBAL, E_GLOBAL, I_GLOBAL, GLOBAL_MAX_ITER,
-    generate_random_displacements, run_multistart_optimization
+    generate_random_displacements
 )
+from core.cost_model import CostModel
+from core.inversion_worker import InversionWorker
+from core.inversion_jobs import JobQueue
+
+# Столбцы таблицы очереди заданий
+JOB_COLUMNS = ["№", "Сил", "Моментов", "Мод", "Стартов", "Статус", "Ошибка, %", "Время, с"]
+# Период обновления статусов "в очереди" -> "выполняется", мс
+JOB_STATUS_INTERVAL = 500
 
 
 class MainGUI(QWidget):
@@ -34,6 +45,12 @@ class MainGUI(QWidget):
 
         self.solver = BeamSolver(L_GLOBAL, E_GLOBAL, {'I': I_GLOBAL, 'h': 0.1})
 
+        # Модель стоимости из analythis (results/cost_model.json), если она уже построена
+        try:
+            self.cost_model = CostModel.load()
+        except (OSError, ValueError, KeyError):
+            self.cost_model = None
+
         # Основной вертикальный layout
         self.main_layout = QVBoxLayout()
         self.setLayout(self.main_layout)
@@ -44,6 +61,15 @@ class MainGUI(QWidget):
         # 2. Прогресс-бар
         self._create_progress_bar()
 
+        # 2a. Очередь заданий (параллельные расчёты на пуле процессов)
+        self.job_queue = JobQueue()
+        self.job_queue.job_finished.connect(self._on_job_finished)
+        self.job_queue.job_failed.connect(self._on_job_failed)
+        self.job_results = {}
+        self.job_rows = {}
+        self.pending_jobs = set()
+        self._create_job_panel()
+
         # 3. Поле вывода текста
         self.textOutput = QTextEdit()
         self.textOutput.setReadOnly(True)
@@ -57,6 +83,7 @@ class MainGUI(QWidget):
         # Инициализация
         self.x_target = None
         self.w_target = None
+        self.worker = None
 
         self.on_regenerate_clicked()
 
@@ -105,6 +132,17 @@ class MainGUI(QWidget):
         self.btnRegenerate = QPushButton("Regenerate")
         self.btnRegenerate.clicked.connect(self.on_regenerate_clicked)
 
+        # Кнопка отмены текущего расчёта
+        self.btnCancel = QPushButton("Отмена")
+        self.btnCancel.setEnabled(False)
+        self.btnCancel.clicked.connect(self.on_cancel_clicked)
+
+        # Оценка длительности по модели стоимости
+        self.estimateLabel = QLabel()
+        for spin in (self.spinForces, self.spinMoments, self.spinModes, self.spinMulti):
+            spin.valueChanged.connect(self._update_estimate)
+        self._update_estimate()
+
         # Размещаем в сетке
         top_layout.addWidget(self.labelForces,    0, 0)
         top_layout.addWidget(self.spinForces,     0, 1)
@@ -118,10 +156,25 @@ class MainGUI(QWidget):
 
         top_layout.addWidget(self.labelMulti,     2, 0)
         top_layout.addWidget(self.spinMulti,      2, 1)
+        top_layout.addWidget(self.estimateLabel,  2, 2)
         top_layout.addWidget(self.btnRegenerate,  2, 3)
+        top_layout.addWidget(self.btnCancel,      2, 4)
 
         self.main_layout.addWidget(top_box)
 
+    def _update_estimate(self):
+        """
+        Оценка времени расчёта для текущих настроек: медиана и 90%-квантиль.
+        """
+        if self.cost_model is None:
+            self.estimateLabel.setText("Оценка: нет модели")
+            return
+        args = (self.spinForces.value(), self.spinMoments.value(),
+                self.spinModes.value(), self.spinMulti.value())
+        t50 = self.cost_model.predict_time(*args)
+        t90 = self.cost_model.predict_time(*args, quantile=0.9)
+        self.estimateLabel.setText(f"Оценка: ~{t50:.0f} с (до {t90:.0f} с)")
+
     def _create_progress_bar(self):
         """
         Создаём progress bar и метки для отображения текущего процента итераций и числа запусков.
@@ -142,12 +195,104 @@ class MainGUI(QWidget):
 
         self.main_layout.addLayout(progress_layout)
 
+    def _create_job_panel(self):
+        """
+        Панель очереди заданий: текущие настройки ставятся в очередь кнопкой,
+        задания выполняются параллельно в пуле процессов, готовые результаты
+        появляются в таблице по мере завершения; двойной щелчок по готовому
+        заданию открывает его на графиках.
+        """
+        job_box = QGroupBox("Очередь заданий")
+        job_layout = QVBoxLayout()
+        job_box.setLayout(job_layout)
+
+        buttons_layout = QHBoxLayout()
+        self.btnEnqueue = QPushButton("В очередь")
+        self.btnEnqueue.clicked.connect(self.on_enqueue_clicked)
+        self.btnCancelPending = QPushButton("Отменить ожидающие")
+        self.btnCancelPending.clicked.connect(self.on_cancel_pending_clicked)
+        self.jobsLabel = QLabel(f"Процессов: {self.job_queue.max_workers}")
+        buttons_layout.addWidget(self.btnEnqueue)
+        buttons_layout.addWidget(self.btnCancelPending)
+        buttons_layout.addWidget(self.jobsLabel)
+        buttons_layout.addStretch()
+        job_layout.addLayout(buttons_layout)
+
+        self.jobTable = QTableWidget(0, len(JOB_COLUMNS))
+        self.jobTable.setHorizontalHeaderLabels(JOB_COLUMNS)
+        self.jobTable.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.jobTable.verticalHeader().setVisible(False)
+        self.jobTable.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.jobTable.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.jobTable.setMaximumHeight(180)
+        self.jobTable.cellDoubleClicked.connect(self.on_job_double_clicked)
+        job_layout.addWidget(self.jobTable)
+
+        # Статусы ожидающих заданий опрашиваются, пока такие задания есть
+        self.jobTimer = QTimer(self)
+        self.jobTimer.setInterval(JOB_STATUS_INTERVAL)
+        self.jobTimer.timeout.connect(self._refresh_job_statuses)
+
+        self.main_layout.addWidget(job_box)
+
+    def _set_job_cell(self, job_id, column, text):
+        self.jobTable.setItem(self.job_rows[job_id], column, QTableWidgetItem(text))
+
+    def on_enqueue_clicked(self):
+        job = {
+            'N_F': self.spinForces.value(),
+            'N_M': self.spinMoments.value(),
+            'N_modes': self.spinModes.value(),
+            'n_starts': self.spinMulti.value(),
+            'max_amplitude': self.spinAmplitude.value(),
+            'n_points': self.n_points,
+        }
+        job_id = self.job_queue.submit(job)
+        self.job_rows[job_id] = self.jobTable.rowCount()
+        self.jobTable.insertRow(self.jobTable.rowCount())
+        for column, value in enumerate([job_id, job['N_F'], job['N_M'], job['N_modes'], job['n_starts']]):
+            self._set_job_cell(job_id, column, str(value))
+        self._set_job_cell(job_id, 5, "в очереди")
+        self.pending_jobs.add(job_id)
+        self.jobTimer.start()
+
+    def on_cancel_pending_clicked(self):
+        for job_id in self.job_queue.cancel_pending():
+            self.pending_jobs.discard(job_id)
+            self._set_job_cell(job_id, 5, "отменено")
+
+    def _refresh_job_statuses(self):
+        for job_id in self.pending_jobs:
+            if self.job_queue.is_running(job_id):
+                self._set_job_cell(job_id, 5, "выполняется")
+        if not self.pending_jobs:
+            self.jobTimer.stop()
+
+    def _on_job_finished(self, job_id, result):
+        self.pending_jobs.discard(job_id)
+        self.job_results[job_id] = result
+        self._set_job_cell(job_id, 5, "готово")
+        self._set_job_cell(job_id, 6, f"{result['best_error'] * 100:.4f}")
+        self._set_job_cell(job_id, 7, f"{result['elapsed_time']:.2f}")
+        self._append_log(result)
+
+    def _on_job_failed(self, job_id, message):
+        self.pending_jobs.discard(job_id)
+        self._set_job_cell(job_id, 5, f"ошибка: {message}")
+
+    def on_job_double_clicked(self, row, column):
+        job_id = int(self.jobTable.item(row, 0).text())
+        if job_id in self.job_results:
+            self._show_result(self.job_results[job_id])
+
     def on_regenerate_clicked(self):
         """
-        Генерирует новую "целевую" кривую перемещений, запускает многостартовую оптимизацию,
-        обновляет графики, выводит результаты и сохраняет итоговые данные в файл data/data.json.
+        Генерирует новую "целевую" кривую перемещений и запускает многостартовую
+        оптимизацию в отдельном потоке (InversionWorker); окно при этом остаётся
+        доступным. Результат обрабатывает _on_inversion_done.
         """
-        import time, os, json, datetime
+        if self.worker is not None:
+            return
 
         # 1. Считываем параметры из управляющих элементов
         N_F = self.spinForces.value()
@@ -164,27 +309,70 @@ class MainGUI(QWidget):
             max_amplitude=self.max_amplitude
         )
 
-        # 3. Запускаем многостартовую оптимизацию с измерением времени
-        start_time = time.time()
-        best_params, best_loads, best_error, best_nit = run_multistart_optimization(
-            solver=self.solver,
-            x_target=self.x_target,
-            w_target=self.w_target,
-            N_F=N_F,
-            N_M=N_M,
-            n_starts=self.n_starts,
-            iteration_callback=self._iteration_callback,
-            start_callback=self._start_callback
+        # 3. Запускаем многостартовую оптимизацию в фоне
+        self.worker = InversionWorker(self.solver, self.x_target, self.w_target, N_F, N_M, self.n_starts)
+        self.worker.progress.connect(self._on_progress)
+        self.worker.result_ready.connect(self._on_inversion_done)
+        self.worker.cancelled.connect(self._on_inversion_cancelled)
+        self.worker.failed.connect(self._on_inversion_failed)
+        self.worker.finished.connect(self._on_worker_finished)
+        self.btnRegenerate.setEnabled(False)
+        self.btnCancel.setEnabled(True)
+        self.worker.start()
+
+    def on_cancel_clicked(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.btnCancel.setEnabled(False)
+            self.progressLabel.setText("Отмена...")
+
+    def _on_worker_finished(self):
+        self.worker.deleteLater()
+        self.worker = None
+        self.btnRegenerate.setEnabled(True)
+        self.btnCancel.setEnabled(False)
+
+    def _on_inversion_cancelled(self):
+        self.progressBar.setValue(0)
+        self.progressLabel.setText("Итерация: 0%")
+        self.textOutput.setHtml("<b>Расчёт отменён.</b>")
+
+    def _on_inversion_failed(self, message):
+        self.textOutput.setHtml(f"<b>Ошибка расчёта:</b> {message}")
+
+    def _on_inversion_done(self, result):
+        """
+        Результат расчёта кнопкой Regenerate: показать и дописать в журнал.
+        """
+        result.update(
+            N_F=self.worker.N_F, N_M=self.worker.N_M, N_modes=self.N_modes,
+            max_amplitude=self.max_amplitude, n_starts=self.n_starts,
+            x_target=self.x_target, w_target=self.w_target
         )
-        elapsed_time = time.time() - start_time
+        self._show_result(result)
+        self._append_log(result)
+
+    def _show_result(self, result):
+        """
+        Обновляет графики и выводит результаты одного расчёта (кнопкой Regenerate
+        или из очереди заданий). result - словарь с параметрами задания
+        (N_F, N_M, N_modes, max_amplitude, n_starts), целевой кривой
+        (x_target, w_target) и итогами оптимизации.
+        """
+        N_F = result['N_F']
+        N_M = result['N_M']
+        best_loads = result['best_loads']
+        best_error = result['best_error']
+        best_nit = result['best_nit']
+        elapsed_time = result['elapsed_time']
 
-        # 4. Вычисляем восстановленные перемещения
-        x_calc, w_calc = self.solver.calculate_deflections_test(best_loads, num_points=len(self.x_target))
+        # 4. Восстановленные перемещения посчитаны вместе с оптимизацией
+        x_calc, w_calc = result['x_calc'], result['w_calc']
 
         # 5. Обновляем графики
         for ax in self.axs:
             ax.clear()
-        self.axs[0].plot(self.x_target, self.w_target, color="blue", label="Исходные")
+        self.axs[0].plot(result['x_target'], result['w_target'], color="blue", label="Исходные")
         self.axs[0].set_title("Исходные перемещения")
         self.axs[0].grid(True)
         self.axs[1].plot(x_calc, w_calc, color="red", label="Восстановленные")
@@ -202,9 +390,9 @@ class MainGUI(QWidget):
                 moments_list.append(f"M = {ld['value']:.3f} Нм, b = {ld['position']:.3f} м")
 
         colA = f"""
-        <b>Число мод:</b> {self.N_modes}, <b>  Амплитуда:</b> {self.max_amplitude:.3f}<br>
+        <b>Число мод:</b> {result['N_modes']}, <b>  Амплитуда:</b> {result['max_amplitude']:.3f}<br>
         <b>Сил:</b> {N_F}, <b>  Моментов:</b> {N_M}<br>
-        <b>Запусков:</b> {self.n_starts}<br>
+        <b>Запусков:</b> {result['n_starts']}<br>
         <b>Ошибка:</b> {best_error * 100:.4f}%<br>
         <b>Количество итераций:</b> {best_nit}<br>
         <b>Время (с):</b> {elapsed_time:.2f}
@@ -225,7 +413,10 @@ class MainGUI(QWidget):
         """
         self.textOutput.setHtml(html_output)
 
-        # 7. Сохраняем итоговые данные в файл data/data.json
+    def _append_log(self, result):
+        """
+        Дописывает итоговые данные расчёта в файл data/data.json.
+        """
         os.makedirs("data", exist_ok=True)
         filepath = os.path.join("data", "data.json")
 
@@ -245,13 +436,13 @@ class MainGUI(QWidget):
         now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         new_record = {
             "timestamp": now_str,
-            "N_F": N_F,
-            "N_M": N_M,
-            "N_modes": self.N_modes,
-            "n_starts": self.n_starts,
-            "error": f"{best_error:.6e}",
-            "iterations": best_nit,
-            "time_s": f"{elapsed_time:.2f}"
+            "N_F": result['N_F'],
+            "N_M": result['N_M'],
+            "N_modes": result['N_modes'],
+            "n_starts": result['n_starts'],
+            "error": f"{result['best_error']:.6e}",
+            "iterations": result['best_nit'],
+            "time_s": f"{result['elapsed_time']:.2f}"
         }
         logs.append(new_record)
 
@@ -343,24 +534,22 @@ class MainGUI(QWidget):
             print(f"ERROR: Не удалось записать в файл {filepath}. Исключение:")
             print(e)
 
-    # ------------------- Колбэки для многостарта и итераций -------------------
-    def _iteration_callback(self, iter_num):
+    # ------------------- Прогресс многостарта и итераций -------------------
+    def _on_progress(self, iter_num, start_i, total_starts):
         """
-        На каждой итерации trust-constr. iter_num / GLOBAL_MAX_ITER -> %.
+        Сигнал InversionWorker (не чаще 20 раз в секунду). iter_num / GLOBAL_MAX_ITER -> %.
         """
         percent = min(int(iter_num / GLOBAL_MAX_ITER * 100), 100)
         self.progressBar.setValue(percent)
         self.progressLabel.setText(f"Итерация: {percent}%")
-        QApplication.processEvents()
-
-    def _start_callback(self, start_i, total_starts):
-        """
-        Перед каждым запуском. Сбрасываем прогресс, пишем 'Запусков: i / total'.
-        """
-        self.progressBar.setValue(0)
-        self.progressLabel.setText("Итерация: 0%")
         self.launchLabel.setText(f"Запусков: {start_i}/{total_starts}")
-        QApplication.processEvents()
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        self.job_queue.shutdown()
+        event.accept()
 
 
 def main():
@@ -376,4 +565,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -1,8 +1,11 @@
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from gui.main_menu import MainMenu
 
 if __name__ == "__main__":
+    # Пул заданий (spawn) в собранном PyInstaller приложении
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = MainMenu()
     window.show()